@@ -0,0 +1,285 @@
+"""
+Benchmark the normalize_l2 pipeline stage by stage.
+
+Corpus: the checked-in data/binance/BTCUSDT/raw minutes, optionally
+extended with synthetic depth deltas (--synthetic-minutes) to scale up to
+hours of data. Each stage runs in a fresh process so peak RSS is per
+stage:
+
+    decode      orjson.loads of raw lines
+    normalize   normalize_delta (fixed-point conversion, cold cache)
+    book        TopBook.apply + best
+    encode      orjson.dumps of normalized and prices records
+    end_to_end  process_raw_dir over the corpus written as minute files
+
+Results are printed as a table and written as JSON (--out) so runs can be
+compared across versions.
+
+    python benchmarks/bench_normalize_l2.py --synthetic-minutes 60 --out bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import orjson  # noqa: E402
+
+from src.pipelines.normalize_l2 import (  # noqa: E402
+    PRICE_SCALE,
+    QTY_SCALE,
+    TopBook,
+    cached_fp,
+    is_depth_delta,
+    micro_fp,
+    mid_fp,
+    normalize_delta,
+    process_raw_dir,
+)
+
+SAMPLE_RAW_DIR = ROOT / "data/binance/BTCUSDT/raw"
+STAGES = ("decode", "normalize", "book", "encode", "end_to_end")
+
+# Lines per synthetic minute file (Binance @100ms depth stream).
+SYNTH_DELTAS_PER_MIN = 600
+
+
+# =========================
+# CORPUS
+# =========================
+
+def synthetic_lines(minutes: int, *, seed: int = 7) -> Iterator[bytes]:
+    """
+    Recorder-format raw lines resembling BTCUSDT @depth@100ms.
+
+    A random-walk mid with ~20-40 near-touch updates per side per delta,
+    some deletions, and occasional far levels, so the book grows the way
+    it does on real captures.
+    """
+    rng = random.Random(seed)
+    mid_ticks = 928_000  # 92800.0 at a 0.1 tick
+    u = 9_617_730_745_100
+    recv_ns = 1_767_756_749_837_619_100
+
+    for _ in range(minutes * SYNTH_DELTAS_PER_MIN):
+        mid_ticks += rng.choice((-3, -1, 0, 0, 1, 3))
+
+        def levels(sign: int) -> List[List[str]]:
+            out = []
+            for _ in range(rng.randint(20, 40)):
+                off = int(rng.expovariate(1 / 40)) + 1
+                if rng.random() < 0.02:
+                    off = rng.randint(1_000, 50_000)
+                px = (mid_ticks + sign * off) / 10
+                qty = 0.0 if rng.random() < 0.2 else rng.expovariate(2.0)
+                out.append([f"{px:.2f}", f"{qty:.3f}"])
+            return out
+
+        U = u + 1
+        u = U + rng.randint(50, 5_000)
+        recv_ns += 100_000_000 + rng.randint(-5_000_000, 5_000_000)
+        yield orjson.dumps({
+            "exchange": "binance",
+            "symbol": "BTCUSDT",
+            "conn_id": 1,
+            "recv_ts_ns": recv_ns,
+            "event_ts_ms": recv_ns // 1_000_000 + rng.randint(-50, 50),
+            "U": U,
+            "u": u,
+            "b": levels(-1),
+            "a": levels(1),
+        })
+
+
+def build_corpus(path: Path, *, synthetic_minutes: int) -> Dict[str, int]:
+    """Write sample + synthetic raw lines to one file; return its size stats."""
+    messages = levels = 0
+    with path.open("wb") as out:
+        sources = [f.read_bytes().splitlines() for f in sorted(SAMPLE_RAW_DIR.glob("deltas_utcmin_*.jsonl"))]
+        sources.append(synthetic_lines(synthetic_minutes))
+        for lines in sources:
+            for line in lines:
+                raw = orjson.loads(line)
+                messages += 1
+                levels += len(raw["b"]) + len(raw["a"])
+                out.write(line + b"\n")
+    return {"messages": messages, "levels": levels, "bytes": path.stat().st_size}
+
+
+# =========================
+# STAGES (run in a fresh process each)
+# =========================
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _prices_record(d: dict, best) -> dict:
+    bid, bid_sz, ask, ask_sz = best
+    return {
+        "exchange": d["exchange"],
+        "symbol": d["symbol"],
+        "recv_ts_ns": d["recv_ts_ns"],
+        "event_ts_ns": d["event_ts_ns"],
+        "best_bid": bid,
+        "bid_sz": bid_sz,
+        "best_ask": ask,
+        "ask_sz": ask_sz,
+        "mid": mid_fp(bid, ask),
+        "micro": micro_fp(bid, bid_sz, ask, ask_sz),
+        "price_scale": PRICE_SCALE,
+        "qty_scale": QTY_SCALE,
+    }
+
+
+def run_stage(stage: str, corpus: str) -> Dict[str, float]:
+    """Prepare the inputs a stage needs, then time only the stage itself."""
+    lines = Path(corpus).read_bytes().splitlines()
+
+    if stage == "end_to_end":
+        work = Path(tempfile.mkdtemp(prefix="bench_normalize_"))
+        raw_dir = work / "BTCUSDT" / "raw"
+        raw_dir.mkdir(parents=True)
+        for i in range(0, len(lines), SYNTH_DELTAS_PER_MIN):
+            chunk = lines[i:i + SYNTH_DELTAS_PER_MIN]
+            (raw_dir / f"deltas_utcmin_{i // SYNTH_DELTAS_PER_MIN}.jsonl").write_bytes(b"\n".join(chunk) + b"\n")
+        rss_before = _peak_rss_mb()
+        t0 = time.perf_counter()
+        process_raw_dir(raw_dir)
+        elapsed = time.perf_counter() - t0
+        shutil.rmtree(work)
+        return {"seconds": elapsed, "peak_rss_mb": _peak_rss_mb(), "rss_before_mb": rss_before}
+
+    raws = None if stage == "decode" else [r for r in map(orjson.loads, lines) if is_depth_delta(r)]
+    deltas = [normalize_delta(r) for r in raws] if stage in ("book", "encode") else None
+    bests = None
+    if stage == "encode":
+        book = TopBook()
+        bests = []
+        for d in deltas:
+            book.apply(d)
+            bests.append(book.best())
+    cached_fp.cache_clear()
+
+    rss_before = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if stage == "decode":
+        for line in lines:
+            orjson.loads(line)
+    elif stage == "normalize":
+        for r in raws:
+            normalize_delta(r)
+    elif stage == "book":
+        book = TopBook()
+        for d in deltas:
+            book.apply(d)
+            book.best()
+    elif stage == "encode":
+        for d, best in zip(deltas, bests):
+            orjson.dumps(d)
+            if best is not None:
+                orjson.dumps(_prices_record(d, best))
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+    elapsed = time.perf_counter() - t0
+
+    return {"seconds": elapsed, "peak_rss_mb": _peak_rss_mb(), "rss_before_mb": rss_before}
+
+
+# =========================
+# DRIVER
+# =========================
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(*, synthetic_minutes: int, repeat: int, stages: List[str]) -> dict:
+    work = Path(tempfile.mkdtemp(prefix="bench_corpus_"))
+    try:
+        corpus_path = work / "corpus.jsonl"
+        corpus = build_corpus(corpus_path, synthetic_minutes=synthetic_minutes)
+
+        results = {}
+        ctx = get_context("spawn")
+        for stage in stages:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    runs.append(pool.submit(run_stage, stage, str(corpus_path)).result())
+            best = min(runs, key=lambda r: r["seconds"])
+            results[stage] = {
+                "seconds": best["seconds"],
+                "msgs_per_sec": corpus["messages"] / best["seconds"],
+                "levels_per_sec": corpus["levels"] / best["seconds"],
+                "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+                "rss_growth_mb": max(r["peak_rss_mb"] - r["rss_before_mb"] for r in runs),
+            }
+    finally:
+        shutil.rmtree(work)
+
+    return {
+        "benchmark": "normalize_l2",
+        "git_revision": git_revision(),
+        "created_at_unix": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "corpus": {**corpus, "synthetic_minutes": synthetic_minutes},
+        "stages": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    c = report["corpus"]
+    print(f"[bench] {c['messages']} msgs, {c['levels']} levels, {c['bytes'] / 1e6:.1f} MB "
+          f"(rev {report['git_revision']}, best of {report['repeat']})")
+    print(f"{'stage':<12}{'sec':>9}{'msgs/s':>12}{'levels/s':>14}{'peak MB':>10}{'+MB':>8}")
+    for stage, r in report["stages"].items():
+        print(f"{stage:<12}{r['seconds']:>9.3f}{r['msgs_per_sec']:>12,.0f}"
+              f"{r['levels_per_sec']:>14,.0f}{r['peak_rss_mb']:>10.1f}{r['rss_growth_mb']:>8.1f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--synthetic-minutes", type=int, default=0,
+                        help="Synthetic minutes appended to the sample corpus (600 deltas each).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--out", type=Path, help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        synthetic_minutes=args.synthetic_minutes,
+        repeat=args.repeat,
+        stages=args.stages,
+    )
+    print_table(report)
+    if args.out is not None:
+        args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
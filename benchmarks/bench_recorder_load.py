@@ -0,0 +1,262 @@
+"""
+Load-test record_depth against a local fake Binance server.
+
+Steps through increasing frame rates (optionally with bursts). At each
+rate the recorder runs in a fresh process pointed at the fake server
+through ws_base, while this process tails the minute files it writes.
+Per rate it reports:
+
+    achieved    lines on disk per second of the run
+    sustained   no QueueFull/reconnect and >= 90% of the frames sent on disk
+    cpu_us      recorder process CPU (all threads) per recorded message
+    latency     recv_ts_ns -> line visible on disk, p50/p90/p99/max ms
+
+The ramp stops at the first rate that is not sustained; the highest
+sustained rate is reported as max_sustained_msgs_per_sec. The tailer
+shares the machine with the recorder, so latencies include its polling.
+
+    python benchmarks/bench_recorder_load.py --rates 1000 5000 20000 --passthrough --out load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_normalize_l2 import git_revision  # noqa: E402
+from benchmarks.fake_binance_ws import FakeDepthServer, sample_levels, synthetic_levels  # noqa: E402
+
+DEFAULT_RATES = (500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000)
+DEFAULT_PORT = 9011
+TAIL_POLL_SEC = 0.002
+SUSTAINED_FRACTION = 0.9
+
+RECV_TS_RE = re.compile(rb'"recv_ts_ns":(\d+)')
+
+
+# =========================
+# RECORDER PROCESS
+# =========================
+
+def run_recorder(
+    ws_base: str,
+    out_dir: str,
+    seconds: float,
+    passthrough: bool,
+    writer_thread: bool,
+    queue_max: Optional[int],
+) -> Dict:
+    """Run record_depth for `seconds` and return its CPU time and error log."""
+    from src.ingestion.exchanges.binance import depth_recorder
+
+    if queue_max is not None:
+        depth_recorder.WRITE_QUEUE_MAX = queue_max
+
+    async def timed():
+        task = asyncio.create_task(depth_recorder.record_depth(
+            symbol="BTCUSDT",
+            out_dir=Path(out_dir),
+            passthrough=passthrough,
+            writer_thread=writer_thread,
+            ws_base=ws_base,
+        ))
+        await asyncio.sleep(seconds)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    log = io.StringIO()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    with contextlib.redirect_stdout(log):
+        asyncio.run(timed())
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    text = log.getvalue()
+    return {
+        "cpu_sec": (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime),
+        "queue_full": "Writer queue full" in text,
+        "errors": [line for line in text.splitlines() if "error" in line],
+    }
+
+
+# =========================
+# DISK TAIL
+# =========================
+
+class DiskTail:
+    """Follows a raw dir's .tmp/final minute files and timestamps each new line."""
+
+    def __init__(self, raw_dir: Path):
+        self.raw_dir = raw_dir
+        self.offsets: Dict[str, int] = {}
+        self.partial: Dict[str, bytes] = {}
+        self.latencies_ns: List[int] = []
+
+    def poll(self) -> None:
+        if not self.raw_dir.exists():
+            return
+        for path in self.raw_dir.glob("deltas_utcmin_*.jsonl*"):
+            stem = path.name.removesuffix(".tmp")
+            try:
+                with path.open("rb") as f:
+                    f.seek(self.offsets.get(stem, 0))
+                    chunk = f.read()
+            except FileNotFoundError:
+                # Renamed between glob and open; picked up next poll.
+                continue
+            if not chunk:
+                continue
+            seen = time.time_ns()
+            self.offsets[stem] = self.offsets.get(stem, 0) + len(chunk)
+            data = self.partial.pop(stem, b"") + chunk
+            *lines, rest = data.split(b"\n")
+            if rest:
+                self.partial[stem] = rest
+            for line in lines:
+                m = RECV_TS_RE.search(line)
+                if m:
+                    self.latencies_ns.append(seen - int(m.group(1)))
+
+
+def percentiles_ms(values_ns: List[int]) -> Dict[str, Optional[float]]:
+    if not values_ns:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    v = sorted(values_ns)
+
+    def at(q):
+        return v[min(len(v) - 1, int(q * len(v)))] / 1e6
+
+    return {"p50": at(0.50), "p90": at(0.90), "p99": at(0.99), "max": v[-1] / 1e6}
+
+
+# =========================
+# DRIVER
+# =========================
+
+async def run_level(levels: List[bytes], rate: float, work: Path, pool, args) -> Dict:
+    server = FakeDepthServer(
+        levels,
+        rate=rate,
+        burst_factor=args.burst_factor,
+        burst_sec=args.burst_sec,
+        burst_period_sec=args.burst_period_sec,
+    )
+    raw_dir = work / f"rate_{int(rate)}" / "raw"
+    tail = DiskTail(raw_dir)
+
+    async with server.serve("127.0.0.1", args.port):
+        fut = asyncio.get_running_loop().run_in_executor(pool, partial(
+            run_recorder,
+            f"ws://127.0.0.1:{args.port}/ws",
+            str(raw_dir),
+            args.seconds,
+            args.passthrough,
+            args.writer_thread,
+            args.queue_max,
+        ))
+        while not fut.done():
+            tail.poll()
+            await asyncio.sleep(TAIL_POLL_SEC)
+        child = await fut
+    tail.poll()
+
+    written = len(tail.latencies_ns)
+    reconnects = max(server.connections - 1, 0)
+    expected = server.due(args.seconds)
+    return {
+        "target_msgs_per_sec": rate,
+        "sent": server.sent,
+        "written": written,
+        "achieved_msgs_per_sec": written / args.seconds,
+        "reconnects": reconnects,
+        "queue_full": child["queue_full"],
+        "sustained": not child["queue_full"] and reconnects == 0 and written >= SUSTAINED_FRACTION * expected,
+        "cpu_us_per_msg": child["cpu_sec"] / written * 1e6 if written else None,
+        "recv_to_disk_ms": percentiles_ms(tail.latencies_ns),
+        "errors": child["errors"][:5],
+    }
+
+
+async def run_benchmark(args) -> Dict:
+    levels = synthetic_levels(args.synthetic_minutes) if args.synthetic_minutes else sample_levels()
+    work = Path(tempfile.mkdtemp(prefix="bench_recorder_"))
+    results = []
+    try:
+        for rate in args.rates:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                r = await run_level(levels, rate, work, pool, args)
+            results.append(r)
+            lat = r["recv_to_disk_ms"]
+            print(
+                f"[bench] {rate:>8,.0f}/s -> {r['achieved_msgs_per_sec']:>9,.0f}/s "
+                f"cpu {r['cpu_us_per_msg'] or 0:6.1f}us/msg  p50 {lat['p50'] or 0:7.1f}ms "
+                f"p99 {lat['p99'] or 0:7.1f}ms  {'ok' if r['sustained'] else 'NOT SUSTAINED'}"
+            )
+            if not r["sustained"]:
+                break
+    finally:
+        shutil.rmtree(work)
+
+    sustained = [r["target_msgs_per_sec"] for r in results if r["sustained"]]
+    return {
+        "benchmark": "recorder_load",
+        "git_revision": git_revision(),
+        "created_at_unix": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "seconds": args.seconds,
+            "passthrough": args.passthrough,
+            "writer_thread": args.writer_thread,
+            "queue_max": args.queue_max,
+            "burst_factor": args.burst_factor,
+            "burst_sec": args.burst_sec,
+            "burst_period_sec": args.burst_period_sec,
+            "frames": len(levels),
+        },
+        "max_sustained_msgs_per_sec": max(sustained) if sustained else None,
+        "levels": results,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rates", type=float, nargs="+", default=list(DEFAULT_RATES),
+                        help="Target frames per second to step through, ascending.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Recording time per rate.")
+    parser.add_argument("--synthetic-minutes", type=int, default=0,
+                        help="Replay synthetic deltas instead of the sample raw minutes.")
+    parser.add_argument("--burst-factor", type=float, default=1.0)
+    parser.add_argument("--burst-sec", type=float, default=0.0)
+    parser.add_argument("--burst-period-sec", type=float, default=0.0)
+    parser.add_argument("--passthrough", action="store_true")
+    parser.add_argument("--writer-thread", action="store_true")
+    parser.add_argument("--queue-max", type=int, help="Override WRITE_QUEUE_MAX in the recorder.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--out", type=Path, help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args))
+    print(f"[bench] max sustained: {report['max_sustained_msgs_per_sec']} msgs/s")
+    if args.out is not None:
+        args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark RotatingJSONLWriter throughput under each durability policy.
+
+Recorded sample lines are written as fast as possible in batches (as
+writer_loop drains them), rotating to a new bucket every
+--items-per-bucket items. Per policy it reports:
+
+    items_per_sec   throughput including the final close (and its fsyncs)
+    max_call_ms     slowest write_batch call, i.e. the worst stall a
+                    recorder's writer would see on its hot path
+    fsyncs          fsync/fdatasync calls made (files + directories)
+
+"inline" is not a writer policy: it fsyncs on the write path after every
+flush, as a baseline for what group commit avoids. Results depend
+heavily on the filesystem; point --dir at the disk you record to.
+
+    python benchmarks/bench_writer_durability.py --items 200000 --dir /data/tmp --out durability.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_normalize_l2 import SAMPLE_RAW_DIR, git_revision  # noqa: E402
+from src.ingestion.writers.durability import DURABILITY_POLICIES  # noqa: E402
+from src.ingestion.writers.rotating_jsonl_writer import (  # noqa: E402
+    RotatingJSONLWriter,
+    WriteItem,
+    WriterConfig,
+    WriterStats,
+)
+
+MODES = (*DURABILITY_POLICIES, "inline")
+
+
+class InlineFsyncWriter(RotatingJSONLWriter):
+    """Baseline: fsync on the write path after every flush."""
+
+    def _flush_file(self, f, now: float) -> None:
+        super()._flush_file(f, now)
+        t0 = time.perf_counter()
+        os.fsync(f.fp.fileno())
+        self.stats.record_fsync(1, time.perf_counter() - t0)
+
+
+def sample_lines() -> List[bytes]:
+    return [
+        line + b"\n"
+        for f in sorted(SAMPLE_RAW_DIR.glob("deltas_utcmin_*.jsonl"))
+        for line in f.read_bytes().splitlines()
+    ]
+
+
+def run_mode(mode: str, lines: List[bytes], args, base: Path) -> Dict:
+    out_dir = Path(tempfile.mkdtemp(prefix=f"durability_{mode}_", dir=base))
+    stats = WriterStats()
+    if mode == "inline":
+        writer = InlineFsyncWriter(out_dir, filename_fn=lambda b: f"bench_{b}.jsonl", stats=stats)
+    else:
+        writer = RotatingJSONLWriter(
+            out_dir,
+            filename_fn=lambda b: f"bench_{b}.jsonl",
+            stats=stats,
+            config=WriterConfig(durability=mode),
+        )
+
+    n = args.items
+    max_call = 0.0
+    t0 = time.perf_counter()
+    for start in range(0, n, args.batch):
+        batch = [
+            WriteItem(i // args.items_per_bucket, lines[i % len(lines)])
+            for i in range(start, min(start + args.batch, n))
+        ]
+        c0 = time.perf_counter()
+        writer.write_batch(batch)
+        max_call = max(max_call, time.perf_counter() - c0)
+    c0 = time.perf_counter()
+    writer.close()
+    close_sec = time.perf_counter() - c0
+    elapsed = time.perf_counter() - t0
+    shutil.rmtree(out_dir)
+
+    return {
+        "mode": mode,
+        "items": n,
+        "seconds": elapsed,
+        "items_per_sec": n / elapsed,
+        "mb_per_sec": stats.bytes_written / 1e6 / elapsed,
+        "max_call_ms": max_call * 1000,
+        "close_ms": close_sec * 1000,
+        "fsyncs": stats.fsyncs,
+        "fsync_sec": stats.fsync_sec,
+    }
+
+
+def run_benchmarks(args) -> Dict:
+    lines = sample_lines()
+    base = args.dir if args.dir is not None else Path(tempfile.gettempdir())
+    results = []
+    for mode in args.modes:
+        runs = [run_mode(mode, lines, args, base) for _ in range(args.repeat)]
+        results.append(max(runs, key=lambda r: r["items_per_sec"]))
+
+    baseline: Optional[float] = next((r["items_per_sec"] for r in results if r["mode"] == "none"), None)
+    for r in results:
+        r["relative_to_none"] = r["items_per_sec"] / baseline if baseline else None
+
+    return {
+        "benchmark": "writer_durability",
+        "git_revision": git_revision(),
+        "created_at_unix": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "items": args.items,
+            "batch": args.batch,
+            "items_per_bucket": args.items_per_bucket,
+            "repeat": args.repeat,
+            "dir": str(base),
+            "avg_line_bytes": sum(map(len, lines)) / len(lines),
+        },
+        "results": results,
+    }
+
+
+def print_table(report: Dict) -> None:
+    print(f"{'mode':<10} {'items/s':>10} {'MB/s':>8} {'rel':>6} {'max call ms':>12} {'close ms':>9} {'fsyncs':>7}")
+    for r in report["results"]:
+        rel = r["relative_to_none"]
+        print(
+            f"{r['mode']:<10} {r['items_per_sec']:>10,.0f} {r['mb_per_sec']:>8.1f} "
+            f"{rel if rel is not None else float('nan'):>6.2f} {r['max_call_ms']:>12.1f} "
+            f"{r['close_ms']:>9.1f} {r['fsyncs']:>7}"
+        )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Items per write_batch call.")
+    parser.add_argument("--items-per-bucket", type=int, default=20_000,
+                        help="Rotate to a new file every N items.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per mode; the fastest is reported.")
+    parser.add_argument("--dir", type=Path, help="Directory to write into (default: system temp).")
+    parser.add_argument("--out", type=Path, help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    print_table(report)
+    if args.out is not None:
+        args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
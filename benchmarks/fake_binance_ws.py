@@ -0,0 +1,158 @@
+"""
+Local stand-in for Binance's futures depth websocket.
+
+Serves depthUpdate frames on ws://<host>:<port>/ws/<stream>, replaying the
+level arrays of the checked-in raw minutes or synthetic deltas at a
+configurable rate. An optional burst shape multiplies the rate for
+`burst_sec` at the start of every `burst_period_sec`. E/T carry the send
+time and U/u/pu form an unbroken chain, so recorder output normalizes
+cleanly.
+
+    python benchmarks/fake_binance_ws.py --rate 2000 --burst-factor 5 --burst-sec 1 --burst-period-sec 10
+    # then record_depth(..., ws_base="ws://127.0.0.1:9001/ws")
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import orjson  # noqa: E402
+import websockets  # noqa: E402
+
+from benchmarks.bench_normalize_l2 import SAMPLE_RAW_DIR, synthetic_lines  # noqa: E402
+
+DEFAULT_PORT = 9001
+
+# Pacing granularity; frames due within a tick are sent back to back.
+TICK_SEC = 0.005
+
+
+# =========================
+# FRAME SOURCES
+# =========================
+
+def _levels_tail(raw: dict) -> bytes:
+    """'"b":[...],"a":[...]}' for splicing after a frame header."""
+    return orjson.dumps({"b": raw["b"], "a": raw["a"]})[1:]
+
+
+def sample_levels(raw_dir: Path = SAMPLE_RAW_DIR) -> List[bytes]:
+    out = []
+    for f in sorted(raw_dir.glob("deltas_utcmin_*.jsonl")):
+        for line in f.read_bytes().splitlines():
+            out.append(_levels_tail(orjson.loads(line)))
+    return out
+
+
+def synthetic_levels(minutes: int) -> List[bytes]:
+    return [_levels_tail(orjson.loads(line)) for line in synthetic_lines(minutes)]
+
+
+# =========================
+# SERVER
+# =========================
+
+class FakeDepthServer:
+    """Paced depthUpdate sender; one independent feed per connection."""
+
+    def __init__(
+        self,
+        levels: List[bytes],
+        *,
+        rate: float,
+        symbol: str = "BTCUSDT",
+        burst_factor: float = 1.0,
+        burst_sec: float = 0.0,
+        burst_period_sec: float = 0.0,
+    ):
+        if not levels:
+            raise ValueError("no frames to replay")
+        self.levels = levels
+        self.rate = rate
+        self.symbol_json = orjson.dumps(symbol)
+        self.burst_factor = burst_factor
+        self.burst_sec = burst_sec
+        self.burst_period_sec = burst_period_sec
+        self.connections = 0
+        self.sent = 0
+        self.next_u = 1_000_000
+
+    def due(self, t: float) -> int:
+        """Frames that should have been sent t seconds into a connection."""
+        n = self.rate * t
+        if self.burst_factor != 1.0 and self.burst_sec > 0 and self.burst_period_sec > 0:
+            periods, into = divmod(t, self.burst_period_sec)
+            in_burst = periods * self.burst_sec + min(into, self.burst_sec)
+            n += self.rate * (self.burst_factor - 1.0) * in_burst
+        return int(n)
+
+    def frame(self, i: int) -> str:
+        U = self.next_u
+        u = U + 9
+        self.next_u = u + 1
+        now_ms = time.time_ns() // 1_000_000
+        head = b'{"e":"depthUpdate","E":%d,"T":%d,"s":%b,"U":%d,"u":%d,"pu":%d,' % (
+            now_ms, now_ms, self.symbol_json, U, u, U - 1,
+        )
+        return (head + self.levels[i % len(self.levels)]).decode()
+
+    async def handler(self, ws) -> None:
+        self.connections += 1
+        start = time.perf_counter()
+        sent = 0
+        try:
+            while True:
+                due = self.due(time.perf_counter() - start)
+                while sent < due:
+                    await ws.send(self.frame(sent))
+                    sent += 1
+                    self.sent += 1
+                await asyncio.sleep(TICK_SEC)
+        except websockets.ConnectionClosed:
+            pass
+
+    def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        """websockets server context manager; use with `async with`."""
+        return websockets.serve(self.handler, host, port, max_size=None)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=10.0, help="Frames per second per connection.")
+    parser.add_argument("--synthetic-minutes", type=int, default=0,
+                        help="Replay synthetic deltas instead of the sample raw minutes.")
+    parser.add_argument("--burst-factor", type=float, default=1.0)
+    parser.add_argument("--burst-sec", type=float, default=0.0)
+    parser.add_argument("--burst-period-sec", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    levels = synthetic_levels(args.synthetic_minutes) if args.synthetic_minutes else sample_levels()
+    server = FakeDepthServer(
+        levels,
+        rate=args.rate,
+        burst_factor=args.burst_factor,
+        burst_sec=args.burst_sec,
+        burst_period_sec=args.burst_period_sec,
+    )
+
+    async def run():
+        async with server.serve(args.host, args.port):
+            print(f"[fake-binance] serving {len(levels)} frames at {args.rate}/s on ws://{args.host}:{args.port}/ws")
+            await asyncio.Future()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
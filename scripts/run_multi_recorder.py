@@ -0,0 +1,11 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.ingestion.exchanges.binance.multi_depth_recorder import main
+
+if __name__ == "__main__":
+    main()
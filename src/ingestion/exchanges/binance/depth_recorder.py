@@ -6,10 +6,16 @@ from typing import Optional
 import orjson
 import websockets
 
+from src.ingestion.exchanges.binance.depth_snapshot import (
+    BINANCE_FAPI_REST,
+    SnapshotCapture,
+)
 from src.ingestion.writers.rotating_jsonl_writer import (
     WriteItem,
+    WriterConfig,
     writer_loop,
 )
+from src.utils.framing import encode_frame
 
 # =========================
 # CONSTANTS
@@ -41,8 +47,8 @@ def minute_filename(bucket: int) -> str:
 # VALIDATION
 # =========================
 
-def validate_depth_msg(msg: dict) -> None:
-    required = ["e", "E", "s", "U", "u", "b", "a"]
+def validate_depth_header(msg: dict) -> None:
+    required = ["e", "E", "s", "U", "u"]
     for k in required:
         if k not in msg:
             raise ValueError(f"Missing key {k}")
@@ -54,10 +60,135 @@ def validate_depth_msg(msg: dict) -> None:
         raise ValueError("E must be int (event time ms)")
     if not isinstance(msg["U"], int) or not isinstance(msg["u"], int):
         raise ValueError("U/u must be int update IDs")
+    if "pu" in msg and not isinstance(msg["pu"], int):
+        raise ValueError("pu must be int (previous final update ID)")
+
+
+def validate_depth_msg(msg: dict) -> None:
+    for k in ("b", "a"):
+        if k not in msg:
+            raise ValueError(f"Missing key {k}")
+    validate_depth_header(msg)
     if not isinstance(msg["b"], list) or not isinstance(msg["a"], list):
         raise ValueError("b/a must be lists")
 
 
+# =========================
+# RECORDS
+# =========================
+
+def build_record(msg: dict, *, symbol: str, conn_id: int, recv_ts: int) -> dict:
+    """Raw recorder record for one validated depthUpdate message."""
+    record = {
+        "exchange": "binance",
+        "symbol": symbol,
+        "conn_id": conn_id,
+        "recv_ts_ns": recv_ts,
+        "event_ts_ms": msg["E"],
+        "U": msg["U"],
+        "u": msg["u"],
+    }
+    # Futures streams chain deltas on pu (previous u).
+    if "pu" in msg:
+        record["pu"] = msg["pu"]
+    record["b"] = msg["b"]
+    record["a"] = msg["a"]
+    return record
+
+
+def enqueue_line(
+    q: asyncio.Queue,
+    recv_ts: int,
+    line: bytes,
+    event_ts_ms: Optional[int] = None,
+) -> None:
+    """
+    Queue a serialized record for its minute file; never drops data silently.
+
+    Passing event_ts_ms timestamps the item for the writer's latency stats.
+    """
+    item = WriteItem(bucket=minute_bucket(recv_ts), line=line)
+    if event_ts_ms is not None:
+        item.event_ts_ms = event_ts_ms
+        item.recv_ts_ns = recv_ts
+        item.enqueue_ts_ns = now_ns()
+    try:
+        q.put_nowait(item)
+    except asyncio.QueueFull:
+        raise RuntimeError(
+            "Writer queue full — disk throughput insufficient; refusing to drop data."
+        )
+
+
+def enqueue_record(q: asyncio.Queue, record: dict, *, latency: bool = False) -> None:
+    enqueue_line(
+        q,
+        record["recv_ts_ns"],
+        orjson.dumps(record) + b"\n",
+        record["event_ts_ms"] if latency else None,
+    )
+
+
+# =========================
+# PASSTHROUGH
+# =========================
+
+def scan_depth_header(frame: bytes) -> Optional[dict]:
+    """
+    Decode only the fields in front of the level arrays of a depthUpdate.
+
+    Binance sends b and a last, so everything before ',"b":[' is a small
+    JSON object holding e/E/s/U/u/pu. Returns None when the frame does not
+    have that shape or its header is invalid; callers then take the full
+    decode path, which reports the actual error.
+    """
+    idx = frame.find(b',"b":[')
+    if idx < 0 or frame[:1] != b"{" or frame[-1:] != b"}" or frame.find(b'],"a":[', idx) < 0:
+        return None
+    try:
+        header = orjson.loads(frame[:idx] + b"}")
+        validate_depth_header(header)
+    except (orjson.JSONDecodeError, ValueError):
+        return None
+    return header
+
+
+def passthrough_line(frame: bytes, header: dict, *, symbol: str, conn_id: int, recv_ts: int) -> bytes:
+    """
+    Recorder line made of the original frame with recorder metadata spliced in.
+
+    The levels are written exactly as received, never decoded or
+    re-encoded. Besides the frame's own fields (e, E, T, s, U, u, pu, b, a)
+    the line carries exchange/symbol/conn_id/recv_ts_ns/event_ts_ms, so the
+    normalizer reads it like a regular record.
+    """
+    head = b'{"exchange":"binance","symbol":%b,"conn_id":%d,"recv_ts_ns":%d,"event_ts_ms":%d,' % (
+        orjson.dumps(symbol),
+        conn_id,
+        recv_ts,
+        header["E"],
+    )
+    return head + frame[1:] + b"\n"
+
+
+def framed_line(frame: bytes, header: dict, *, conn_id: int, recv_ts: int) -> bytes:
+    """
+    Length-prefixed record (src.utils.framing) with the original frame as payload.
+
+    recv_ts_ns, conn_id, E, U, u and pu go into the fixed record header,
+    so readers can filter records without decoding the frame.
+    """
+    return encode_frame(
+        frame,
+        conn_id=conn_id,
+        recv_ts_ns=recv_ts,
+        event_ts_ms=header["E"],
+        U=header["U"],
+        u=header["u"],
+        pu=header.get("pu"),
+    )
+
+
 # =========================
 # PUBLIC API
 # =========================
@@ -67,6 +198,12 @@ async def record_depth(
     symbol: str,
     out_dir: Path,
     interval_ms: int = 100,
+    passthrough: bool = False,
+    writer_thread: bool = False,
+    ws_base: str = BINANCE_FSTREAM_WS,
+    snapshot_dir: Optional[Path] = None,
+    rest_base: str = BINANCE_FAPI_REST,
+    writer_config: Optional[WriterConfig] = None,
 ) -> None:
     """
     Record raw Binance futures depth deltas into minute-rotated JSONL files.
@@ -79,10 +216,31 @@ async def record_depth(
         Directory where raw files will be written
     interval_ms : int
         Depth update interval (Binance supports 100ms)
+    passthrough : bool
+        Write each frame's original bytes with recorder metadata spliced
+        in instead of decoding and re-encoding it (see passthrough_line)
+    writer_thread : bool
+        Do file I/O on a dedicated writer thread instead of the event loop
+    ws_base : str
+        Websocket base URL; override to point at a local test server
+    snapshot_dir : Path, optional
+        If set, capture REST depth snapshots here at every connect and
+        after every pu gap (see SnapshotCapture)
+    rest_base : str
+        REST base URL for snapshots; override to point at a local test server
+    writer_config : WriterConfig, optional
+        Minute file options (see WriterConfig). latency_stats writes
+        event->recv, recv->enqueue and enqueue->flush latency histograms
+        to a deltas_utcmin_<bucket>.stats.json per minute file; framing
+        "frames" writes deltas_utcmin_<bucket>.frames files of
+        length-prefixed records holding the original frames (see
+        framed_line and src.utils.framing) and implies passthrough
     """
+    writer_config = writer_config if writer_config is not None else WriterConfig()
+    latency_stats = writer_config.latency_stats
 
     stream = f"{symbol.lower()}@depth@{interval_ms}ms"
-    url = f"{BINANCE_FSTREAM_WS}/{stream}"
+    url = f"{ws_base}/{stream}"
 
     q: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAX)
 
@@ -90,9 +248,17 @@ async def record_depth(
         writer_loop(
             out_dir=out_dir,
             filename_fn=minute_filename,
+            bucket_sec=ROTATE_GRANULARITY_SEC,
             queue=q,
+            threaded=writer_thread,
+            config=writer_config,
         )
     )
+    framed = writer_config.framed
+
+    snapshots = None
+    if snapshot_dir is not None:
+        snapshots = SnapshotCapture(symbol=symbol, snapshot_dir=snapshot_dir, rest_base=rest_base)
 
     backoff = 0.25
     max_backoff = 10.0
@@ -110,35 +276,40 @@ async def record_depth(
                 conn_id += 1
                 print(f"[binance] connected (conn_id={conn_id}) {stream}")
                 backoff = 0.25
+                if snapshots is not None:
+                    snapshots.on_connect(conn_id)
 
                 while True:
                     raw = await ws.recv()
                     recv_ts = now_ns()
 
+                    if passthrough or framed:
+                        frame = raw.encode() if isinstance(raw, str) else raw
+                        header = scan_depth_header(frame)
+                        if header is not None:
+                            if snapshots is not None:
+                                snapshots.observe(header)
+                            if framed:
+                                line = framed_line(frame, header, conn_id=conn_id, recv_ts=recv_ts)
+                            else:
+                                line = passthrough_line(
+                                    frame, header, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts
+                                )
+                            enqueue_line(q, recv_ts, line, header["E"] if latency_stats else None)
+                            continue
+
                     msg = orjson.loads(raw)
                     validate_depth_msg(msg)
+                    if snapshots is not None:
+                        snapshots.observe(msg)
 
-                    record = {
-                        "exchange": "binance",
-                        "symbol": symbol,
-                        "conn_id": conn_id,
-                        "recv_ts_ns": recv_ts,
-                        "event_ts_ms": msg["E"],
-                        "U": msg["U"],
-                        "u": msg["u"],
-                        "b": msg["b"],
-                        "a": msg["a"],
-                    }
-
-                    bucket = minute_bucket(recv_ts)
-                    line = orjson.dumps(record) + b"\n"
-
-                    try:
-                        q.put_nowait(WriteItem(bucket=bucket, line=line))
-                    except asyncio.QueueFull:
-                        raise RuntimeError(
-                            "Writer queue full — disk throughput insufficient; refusing to drop data."
-                        )
+                    if framed:
+                        line = framed_line(frame, msg, conn_id=conn_id, recv_ts=recv_ts)
+                        enqueue_line(q, recv_ts, line, msg["E"] if latency_stats else None)
+                        continue
+
+                    record = build_record(msg, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts)
+                    enqueue_record(q, record, latency=latency_stats)
 
         except (asyncio.CancelledError, KeyboardInterrupt):
             print("[binance] stopping recorder")
@@ -152,20 +323,116 @@ async def record_depth(
             backoff = min(max_backoff, backoff * 2)
 
     # graceful shutdown
+    if snapshots is not None:
+        await snapshots.close()
     await q.put(None)
     await writer_task
 
 
-def main() -> None:
+def main(argv=None) -> None:
     """Legacy entrypoint: record BTCUSDT raw depth deltas into data/binance/BTCUSDT/raw."""
+    import argparse
     import asyncio
     from pathlib import Path
 
     ROOT = Path(__file__).resolve().parents[4]
 
+    parser = argparse.ArgumentParser(description="Record BTCUSDT raw depth deltas.")
+    parser.add_argument(
+        "--passthrough",
+        action="store_true",
+        help="Write original frame bytes with recorder metadata spliced in (no re-encode).",
+    )
+    parser.add_argument(
+        "--writer-thread",
+        action="store_true",
+        help="Do file I/O on a dedicated thread so disk stalls cannot block the websocket.",
+    )
+    parser.add_argument(
+        "--latency-stats",
+        action="store_true",
+        help="Write per-minute latency histograms to deltas_utcmin_<bucket>.stats.json.",
+    )
+    parser.add_argument(
+        "--snapshots",
+        action="store_true",
+        help="Capture REST depth snapshots into data/binance/BTCUSDT/snapshots at connect and on pu gaps.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["zstd", "gzip"],
+        help="Compress minute files as they are written (.jsonl.zst / .jsonl.gz).",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        help="Compression level (default: zstd 3, gzip 6).",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=["none", "interval", "rotate"],
+        default="none",
+        help="fsync policy: none (default), interval (group commit every second) or rotate (per finalized file).",
+    )
+    parser.add_argument(
+        "--index-every",
+        type=int,
+        help="Write a deltas_utcmin_<bucket>.idx seek index with an entry every N lines.",
+    )
+    parser.add_argument(
+        "--framing",
+        choices=["jsonl", "frames"],
+        default="jsonl",
+        help="Raw file format: jsonl (default) or frames (length-prefixed records, .frames).",
+    )
+    parser.add_argument(
+        "--open-buckets",
+        type=int,
+        default=1,
+        help="Minute files kept open at once for late items (default: 1).",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=1,
+        help="Concurrent connections to the stream, deduplicated by u (default: 1).",
+    )
+    args = parser.parse_args(argv)
+    if args.snapshots and args.connections > 1:
+        parser.error("--snapshots is only supported with a single connection")
+
+    writer_config = WriterConfig(
+        latency_stats=args.latency_stats,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        durability=args.durability,
+        index_every=args.index_every,
+        framing=args.framing,
+        open_buckets=args.open_buckets,
+    )
+
+    if args.connections > 1:
+        from src.ingestion.exchanges.binance.redundant_depth_recorder import record_depth_redundant
+
+        asyncio.run(
+            record_depth_redundant(
+                symbol='BTCUSDT',
+                out_dir=ROOT / 'data/binance/BTCUSDT/raw',
+                connections=args.connections,
+                passthrough=args.passthrough,
+                writer_thread=args.writer_thread,
+                writer_config=writer_config,
+            )
+        )
+        return
+
     asyncio.run(
         record_depth(
             symbol='BTCUSDT',
             out_dir=ROOT / 'data/binance/BTCUSDT/raw',
+            passthrough=args.passthrough,
+            writer_thread=args.writer_thread,
+            snapshot_dir=ROOT / 'data/binance/BTCUSDT/snapshots' if args.snapshots else None,
+            writer_config=writer_config,
         )
     )
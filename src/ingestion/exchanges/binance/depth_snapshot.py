@@ -0,0 +1,152 @@
+import asyncio
+import time
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+# =========================
+# CONSTANTS
+# =========================
+
+BINANCE_FAPI_REST = "https://fapi.binance.com"
+DEPTH_PATH = "/fapi/v1/depth"
+
+# Max depth Binance returns; request weight 20.
+SNAPSHOT_LIMIT = 1000
+SNAPSHOT_TIMEOUT_SEC = 10.0
+
+# Snapshots are requested at most this often per recorder; gaps inside the
+# window are covered by the next snapshot.
+SNAPSHOT_MIN_INTERVAL_SEC = 5.0
+
+
+# =========================
+# REST
+# =========================
+
+def snapshot_filename(last_update_id: int) -> str:
+    return f"snapshot_{last_update_id}.json"
+
+
+def fetch_depth_snapshot(
+    symbol: str,
+    *,
+    rest_base: str = BINANCE_FAPI_REST,
+    limit: int = SNAPSHOT_LIMIT,
+) -> dict:
+    """GET /fapi/v1/depth (blocking); validates the fields replay relies on."""
+    url = f"{rest_base}{DEPTH_PATH}?symbol={symbol}&limit={limit}"
+    with urllib.request.urlopen(url, timeout=SNAPSHOT_TIMEOUT_SEC) as resp:
+        snap = orjson.loads(resp.read())
+
+    if not isinstance(snap.get("lastUpdateId"), int):
+        raise ValueError("snapshot lastUpdateId must be int")
+    if not isinstance(snap.get("bids"), list) or not isinstance(snap.get("asks"), list):
+        raise ValueError("snapshot bids/asks must be lists")
+    return snap
+
+
+def write_snapshot(snapshot_dir: Path, record: dict) -> Path:
+    """Write one snapshot record via .tmp + atomic rename."""
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_dir / snapshot_filename(record["lastUpdateId"])
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(orjson.dumps(record))
+    tmp.replace(path)
+    return path
+
+
+# =========================
+# RECORDER HOOK
+# =========================
+
+class SnapshotCapture:
+    """
+    REST depth snapshots aligned with a recorder's websocket stream.
+
+    A snapshot is requested on every (re)connect and whenever a delta's
+    pu does not chain onto the previous delta's u. Fetches run in a
+    background task (HTTP on a worker thread), so the receive loop keeps
+    consuming and recording the stream meanwhile, as Binance's book
+    procedure requires. Requests are coalesced and spaced at least
+    SNAPSHOT_MIN_INTERVAL_SEC apart; a gap seen during a fetch triggers
+    another one afterwards. Failures are logged and retried.
+
+    Files are <snapshot_dir>/snapshot_<lastUpdateId>.json holding the
+    recorder metadata plus the raw b/a levels.
+    """
+
+    def __init__(
+        self,
+        *,
+        symbol: str,
+        snapshot_dir: Path,
+        rest_base: str = BINANCE_FAPI_REST,
+    ):
+        self.symbol = symbol
+        self.snapshot_dir = snapshot_dir
+        self.rest_base = rest_base
+        self.conn_id = 0
+        self.prev_u: Optional[int] = None
+        self.wanted: Optional[str] = None
+        self.last_fetch = float("-inf")
+        self.task: Optional[asyncio.Task] = None
+
+    def on_connect(self, conn_id: int) -> None:
+        self.conn_id = conn_id
+        self.prev_u = None
+        self.request("connect")
+
+    def observe(self, msg: dict) -> None:
+        """Feed each delta's header (needs u, and pu when the stream sends it)."""
+        pu = msg.get("pu")
+        if pu is not None and self.prev_u is not None and pu != self.prev_u:
+            print(f"[binance] {self.symbol} pu gap: pu={pu} prev_u={self.prev_u}")
+            self.request("gap")
+        self.prev_u = msg["u"]
+
+    def request(self, reason: str) -> None:
+        self.wanted = reason
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self.wanted is not None:
+            delay = self.last_fetch + SNAPSHOT_MIN_INTERVAL_SEC - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            reason, self.wanted = self.wanted, None
+            self.last_fetch = time.monotonic()
+            try:
+                path = await asyncio.to_thread(self._capture, reason, self.conn_id)
+                print(f"[binance] snapshot ({reason}) -> {path.name}")
+            except Exception as e:
+                print(f"[binance] snapshot ({reason}) failed: {type(e).__name__}: {e} — retrying")
+                if self.wanted is None:
+                    self.wanted = reason
+
+    def _capture(self, reason: str, conn_id: int) -> Path:
+        request_ts = time.time_ns()
+        snap = fetch_depth_snapshot(self.symbol, rest_base=self.rest_base)
+        return write_snapshot(self.snapshot_dir, {
+            "exchange": "binance",
+            "symbol": self.symbol,
+            "conn_id": conn_id,
+            "reason": reason,
+            "request_ts_ns": request_ts,
+            "recv_ts_ns": time.time_ns(),
+            "event_ts_ms": snap.get("E"),
+            "lastUpdateId": snap["lastUpdateId"],
+            "b": snap["bids"],
+            "a": snap["asks"],
+        })
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
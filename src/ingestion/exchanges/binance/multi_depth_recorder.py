@@ -0,0 +1,286 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import orjson
+import websockets
+
+from src.ingestion.exchanges.binance.depth_recorder import (
+    ROTATE_GRANULARITY_SEC,
+    WRITE_QUEUE_MAX,
+    build_record,
+    enqueue_line,
+    enqueue_record,
+    framed_line,
+    minute_filename,
+    now_ns,
+    passthrough_line,
+    scan_depth_header,
+    validate_depth_msg,
+)
+from src.ingestion.writers.rotating_jsonl_writer import WriterConfig, writer_loop
+
+# =========================
+# CONSTANTS
+# =========================
+
+BINANCE_FSTREAM_COMBINED_WS = "wss://fstream.binance.com/stream"
+
+# Binance rejects combined-stream URLs with more streams than this.
+MAX_STREAMS_PER_CONN = 200
+
+
+# =========================
+# SHARDING
+# =========================
+
+def shard_symbols(symbols: Sequence[str], connections: int) -> List[List[str]]:
+    """Round-robin symbols over at most `connections` non-empty shards."""
+    if connections < 1:
+        raise ValueError("connections must be >= 1")
+    shards = [list(symbols[i::connections]) for i in range(connections)]
+    shards = [s for s in shards if s]
+    for s in shards:
+        if len(s) > MAX_STREAMS_PER_CONN:
+            raise ValueError(
+                f"{len(s)} symbols on one connection exceeds {MAX_STREAMS_PER_CONN}; "
+                "use more connections"
+            )
+    return shards
+
+
+def combined_stream_url(
+    symbols: Sequence[str],
+    interval_ms: int,
+    ws_base: str = BINANCE_FSTREAM_COMBINED_WS,
+) -> str:
+    streams = "/".join(f"{s.lower()}@depth@{interval_ms}ms" for s in symbols)
+    return f"{ws_base}?streams={streams}"
+
+
+def combined_payload(frame: bytes) -> Optional[bytes]:
+    """The "data" object of a {"stream": ..., "data": {...}} frame, without decoding it."""
+    idx = frame.find(b'"data":')
+    if idx < 0 or frame[-1:] != b"}":
+        return None
+    return frame[idx + len(b'"data":'):-1]
+
+
+# =========================
+# CONNECTION
+# =========================
+
+async def _record_shard(
+    *,
+    shard_id: int,
+    symbols: List[str],
+    queues: Dict[str, asyncio.Queue],
+    interval_ms: int,
+    passthrough: bool,
+    framed: bool,
+    ws_base: str,
+    latency_stats: bool,
+) -> None:
+    """Reconnect loop for one combined-stream connection."""
+    url = combined_stream_url(symbols, interval_ms, ws_base)
+    by_stream_symbol = {s.upper(): s for s in symbols}
+
+    backoff = 0.25
+    max_backoff = 10.0
+    conn_id = 0
+
+    while True:
+        try:
+            async with websockets.connect(
+                url,
+                ping_interval=15,
+                ping_timeout=10,
+                max_queue=8192,
+                close_timeout=5,
+            ) as ws:
+                conn_id += 1
+                print(f"[binance] connected (shard={shard_id}, conn_id={conn_id}) {len(symbols)} symbols")
+                backoff = 0.25
+
+                while True:
+                    raw = await ws.recv()
+                    recv_ts = now_ns()
+
+                    if passthrough or framed:
+                        frame = combined_payload(raw.encode() if isinstance(raw, str) else raw)
+                        header = scan_depth_header(frame) if frame is not None else None
+                        symbol = by_stream_symbol.get(header["s"]) if header is not None else None
+                        if symbol is not None:
+                            if framed:
+                                line = framed_line(frame, header, conn_id=conn_id, recv_ts=recv_ts)
+                            else:
+                                line = passthrough_line(
+                                    frame, header, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts
+                                )
+                            enqueue_line(queues[symbol], recv_ts, line, header["E"] if latency_stats else None)
+                            continue
+
+                    msg = orjson.loads(raw)["data"]
+                    validate_depth_msg(msg)
+
+                    symbol = by_stream_symbol.get(msg["s"])
+                    if symbol is None:
+                        raise ValueError(f"Unexpected symbol on shard {shard_id}: {msg['s']}")
+
+                    if framed:
+                        line = framed_line(orjson.dumps(msg), msg, conn_id=conn_id, recv_ts=recv_ts)
+                        enqueue_line(queues[symbol], recv_ts, line, msg["E"] if latency_stats else None)
+                        continue
+
+                    record = build_record(msg, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts)
+                    enqueue_record(queues[symbol], record, latency=latency_stats)
+
+        except (asyncio.CancelledError, KeyboardInterrupt):
+            print(f"[binance] stopping shard {shard_id}")
+            break
+        except Exception as e:
+            print(
+                f"[binance] shard {shard_id} error: {type(e).__name__}: {e} "
+                f"— reconnecting in {backoff:.2f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(max_backoff, backoff * 2)
+
+
+# =========================
+# PUBLIC API
+# =========================
+
+async def record_depth_multi(
+    *,
+    symbols: Sequence[str],
+    base_dir: Path,
+    connections: int = 1,
+    interval_ms: int = 100,
+    passthrough: bool = False,
+    writer_thread: bool = False,
+    ws_base: str = BINANCE_FSTREAM_COMBINED_WS,
+    writer_config: Optional[WriterConfig] = None,
+) -> None:
+    """
+    Record raw depth deltas for many symbols over combined-stream connections.
+
+    Frames are demultiplexed by symbol into one writer per symbol, so each
+    symbol gets the same minute-rotated files record_depth produces, under
+    <base_dir>/<SYMBOL>/raw.
+
+    Parameters
+    ----------
+    symbols : sequence of str
+        Trading symbols, e.g. ["BTCUSDT", "ETHUSDT"]
+    base_dir : Path
+        Exchange data directory, e.g. data/binance
+    connections : int
+        Number of websocket connections to shard symbols across
+    interval_ms : int
+        Depth update interval (Binance supports 100ms)
+    passthrough : bool
+        Write original frame bytes with recorder metadata spliced in
+        (see depth_recorder.passthrough_line)
+    writer_thread : bool
+        Do file I/O on one dedicated thread per symbol directory
+    ws_base : str
+        Combined-stream base URL; override to point at a local test server
+    writer_config : WriterConfig, optional
+        Minute file options for every symbol's writer (see record_depth);
+        with framing "frames" each record holds the symbol's "data" object
+        as payload, and open_buckets applies per symbol
+    """
+    writer_config = writer_config if writer_config is not None else WriterConfig()
+    symbols = list(dict.fromkeys(symbols))
+    shards = shard_symbols(symbols, connections)
+
+    queues: Dict[str, asyncio.Queue] = {}
+    writer_tasks = []
+    for symbol in symbols:
+        q: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAX)
+        queues[symbol] = q
+        writer_tasks.append(
+            asyncio.create_task(
+                writer_loop(
+                    out_dir=base_dir / symbol / "raw",
+                    filename_fn=minute_filename,
+                    bucket_sec=ROTATE_GRANULARITY_SEC,
+                    queue=q,
+                    threaded=writer_thread,
+                    config=writer_config,
+                )
+            )
+        )
+
+    try:
+        await asyncio.gather(*(
+            _record_shard(
+                shard_id=i,
+                symbols=shard,
+                queues=queues,
+                interval_ms=interval_ms,
+                passthrough=passthrough,
+                framed=writer_config.framed,
+                ws_base=ws_base,
+                latency_stats=writer_config.latency_stats,
+            )
+            for i, shard in enumerate(shards)
+        ))
+    finally:
+        # graceful shutdown
+        for q in queues.values():
+            await q.put(None)
+        await asyncio.gather(*writer_tasks)
+
+
+def main(argv=None) -> None:
+    """Record several symbols into data/binance/<SYMBOL>/raw."""
+    import argparse
+
+    ROOT = Path(__file__).resolve().parents[4]
+
+    parser = argparse.ArgumentParser(description="Record Binance futures depth for many symbols.")
+    parser.add_argument("symbols", nargs="+", help="Symbols to record, e.g. BTCUSDT ETHUSDT")
+    parser.add_argument("--connections", type=int, default=1,
+                        help="Websocket connections to shard symbols across (default: 1).")
+    parser.add_argument("--interval-ms", type=int, default=100)
+    parser.add_argument("--passthrough", action="store_true",
+                        help="Write original frame bytes with recorder metadata spliced in (no re-encode).")
+    parser.add_argument("--writer-thread", action="store_true",
+                        help="Do file I/O on one thread per symbol so disk stalls cannot block the websockets.")
+    parser.add_argument("--latency-stats", action="store_true",
+                        help="Write per-minute latency histograms to deltas_utcmin_<bucket>.stats.json.")
+    parser.add_argument("--compression", choices=["zstd", "gzip"],
+                        help="Compress minute files as they are written (.jsonl.zst / .jsonl.gz).")
+    parser.add_argument("--compression-level", type=int,
+                        help="Compression level (default: zstd 3, gzip 6).")
+    parser.add_argument("--durability", choices=["none", "interval", "rotate"], default="none",
+                        help="fsync policy: none (default), interval (group commit every second) or rotate.")
+    parser.add_argument("--index-every", type=int,
+                        help="Write a deltas_utcmin_<bucket>.idx seek index with an entry every N lines.")
+    parser.add_argument("--framing", choices=["jsonl", "frames"], default="jsonl",
+                        help="Raw file format: jsonl (default) or frames (length-prefixed records, .frames).")
+    parser.add_argument("--open-buckets", type=int, default=1,
+                        help="Minute files kept open at once per symbol for late items (default: 1).")
+    args = parser.parse_args(argv)
+
+    asyncio.run(
+        record_depth_multi(
+            symbols=[s.upper() for s in args.symbols],
+            base_dir=ROOT / "data/binance",
+            connections=args.connections,
+            interval_ms=args.interval_ms,
+            passthrough=args.passthrough,
+            writer_thread=args.writer_thread,
+            writer_config=WriterConfig(
+                latency_stats=args.latency_stats,
+                compression=args.compression,
+                compression_level=args.compression_level,
+                durability=args.durability,
+                index_every=args.index_every,
+                framing=args.framing,
+                open_buckets=args.open_buckets,
+            ),
+        )
+    )
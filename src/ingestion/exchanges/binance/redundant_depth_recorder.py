@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+import websockets
+
+from src.ingestion.exchanges.binance.depth_recorder import (
+    BINANCE_FSTREAM_WS,
+    ROTATE_GRANULARITY_SEC,
+    WRITE_QUEUE_MAX,
+    build_record,
+    enqueue_line,
+    enqueue_record,
+    framed_line,
+    minute_filename,
+    now_ns,
+    passthrough_line,
+    scan_depth_header,
+    validate_depth_msg,
+)
+from src.ingestion.writers.rotating_jsonl_writer import WriterConfig, writer_loop
+
+# =========================
+# CONSTANTS
+# =========================
+
+# Recently written final update IDs remembered for deduplication. At
+# @100ms this covers well over an hour of one stream.
+DEDUPE_WINDOW = 50_000
+
+# Delay before each extra connection's first connect, so the connections
+# do not share a connect/disconnect schedule.
+CONNECT_STAGGER_SEC = 1.0
+
+STATS_FILENAME = "redundancy_stats.json"
+STATS_INTERVAL_SEC = 10.0
+
+
+# =========================
+# DEDUPLICATION
+# =========================
+
+@dataclass
+class SlotStats:
+    """Per-connection counters; latencies in nanoseconds."""
+
+    slot: int
+    conn_id: int = 0
+    connects: int = 0
+    received: int = 0
+    won: int = 0
+    duplicates: int = 0
+    event_to_recv_sum: int = 0
+    event_to_recv_max: int = 0
+    lag_sum: int = 0
+    lag_max: int = 0
+
+    def report(self) -> dict:
+        return {
+            "slot": self.slot,
+            "conn_id": self.conn_id,
+            "connects": self.connects,
+            "received": self.received,
+            "won": self.won,
+            "duplicates": self.duplicates,
+            "win_rate": self.won / self.received if self.received else None,
+            "mean_event_to_recv_ms": self.event_to_recv_sum / self.received / 1e6 if self.received else None,
+            "max_event_to_recv_ms": self.event_to_recv_max / 1e6,
+            "mean_lag_behind_winner_ms": self.lag_sum / self.duplicates / 1e6 if self.duplicates else None,
+            "max_lag_behind_winner_ms": self.lag_max / 1e6,
+        }
+
+
+class UpdateDeduper:
+    """
+    First-delivery-wins filter keyed by final update ID u.
+
+    Remembers the last `window` written IDs with their receive time, so a
+    later copy also yields how far its connection lagged the winner.
+    """
+
+    def __init__(self, window: int = DEDUPE_WINDOW):
+        self.window = window
+        self.first_recv: "OrderedDict[int, int]" = OrderedDict()
+
+    def offer(self, stats: SlotStats, u: int, recv_ts: int, event_ts_ms: int) -> bool:
+        """Account one delivery; True if this is the first copy of u."""
+        stats.received += 1
+        e2r = recv_ts - event_ts_ms * 1_000_000
+        stats.event_to_recv_sum += e2r
+        if e2r > stats.event_to_recv_max:
+            stats.event_to_recv_max = e2r
+
+        first = self.first_recv.get(u)
+        if first is not None:
+            stats.duplicates += 1
+            lag = recv_ts - first
+            stats.lag_sum += lag
+            if lag > stats.lag_max:
+                stats.lag_max = lag
+            return False
+
+        self.first_recv[u] = recv_ts
+        if len(self.first_recv) > self.window:
+            self.first_recv.popitem(last=False)
+        stats.won += 1
+        return True
+
+
+def write_stats(path: Path, symbol: str, slots: List[SlotStats]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(orjson.dumps({
+        "symbol": symbol,
+        "updated_at_unix": int(time.time()),
+        "dedupe_window": DEDUPE_WINDOW,
+        "slots": [s.report() for s in slots],
+    }, option=orjson.OPT_INDENT_2))
+    tmp.replace(path)
+
+
+# =========================
+# CONNECTION
+# =========================
+
+async def _record_slot(
+    *,
+    stats: SlotStats,
+    conn_ids: "itertools.count[int]",
+    url: str,
+    stream: str,
+    symbol: str,
+    q: asyncio.Queue,
+    deduper: UpdateDeduper,
+    passthrough: bool,
+    framed: bool,
+    latency_stats: bool,
+) -> None:
+    """Reconnect loop for one of the redundant connections."""
+    await asyncio.sleep(stats.slot * CONNECT_STAGGER_SEC)
+
+    backoff = 0.25
+    max_backoff = 10.0
+
+    while True:
+        try:
+            async with websockets.connect(
+                url,
+                ping_interval=15,
+                ping_timeout=10,
+                max_queue=8192,
+                close_timeout=5,
+            ) as ws:
+                conn_id = next(conn_ids)
+                stats.conn_id = conn_id
+                stats.connects += 1
+                print(f"[binance] connected (slot={stats.slot}, conn_id={conn_id}) {stream}")
+                backoff = 0.25
+
+                while True:
+                    raw = await ws.recv()
+                    recv_ts = now_ns()
+
+                    if passthrough or framed:
+                        frame = raw.encode() if isinstance(raw, str) else raw
+                        header = scan_depth_header(frame)
+                        if header is not None:
+                            if deduper.offer(stats, header["u"], recv_ts, header["E"]):
+                                if framed:
+                                    line = framed_line(frame, header, conn_id=conn_id, recv_ts=recv_ts)
+                                else:
+                                    line = passthrough_line(
+                                        frame, header, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts
+                                    )
+                                enqueue_line(q, recv_ts, line, header["E"] if latency_stats else None)
+                            continue
+
+                    msg = orjson.loads(raw)
+                    validate_depth_msg(msg)
+
+                    if deduper.offer(stats, msg["u"], recv_ts, msg["E"]):
+                        if framed:
+                            line = framed_line(frame, msg, conn_id=conn_id, recv_ts=recv_ts)
+                            enqueue_line(q, recv_ts, line, msg["E"] if latency_stats else None)
+                        else:
+                            record = build_record(msg, symbol=symbol, conn_id=conn_id, recv_ts=recv_ts)
+                            enqueue_record(q, record, latency=latency_stats)
+
+        except (asyncio.CancelledError, KeyboardInterrupt):
+            print(f"[binance] stopping slot {stats.slot}")
+            break
+        except Exception as e:
+            print(
+                f"[binance] slot {stats.slot} error: {type(e).__name__}: {e} "
+                f"— reconnecting in {backoff:.2f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(max_backoff, backoff * 2)
+
+
+async def _stats_loop(path: Path, symbol: str, slots: List[SlotStats]) -> None:
+    while True:
+        await asyncio.sleep(STATS_INTERVAL_SEC)
+        write_stats(path, symbol, slots)
+
+
+# =========================
+# PUBLIC API
+# =========================
+
+async def record_depth_redundant(
+    *,
+    symbol: str,
+    out_dir: Path,
+    connections: int = 2,
+    interval_ms: int = 100,
+    passthrough: bool = False,
+    writer_thread: bool = False,
+    ws_base: str = BINANCE_FSTREAM_WS,
+    writer_config: Optional[WriterConfig] = None,
+) -> None:
+    """
+    Record one depth stream over several concurrent connections.
+
+    Every delta is written once, by whichever connection delivers its
+    final update ID u first, so a reconnect on one connection leaves no
+    gap while another is up. Files have the same layout as record_depth's;
+    conn_id is unique across all connections and identifies the winner.
+    Per-connection win rates and latencies are kept in
+    <out_dir>/redundancy_stats.json.
+
+    A delta that only a lagging connection delivers, after the leader has
+    skipped it during a reconnect, is written when it arrives and may
+    follow deltas with a higher u.
+
+    Parameters
+    ----------
+    symbol : str
+        Trading symbol, e.g. "BTCUSDT"
+    out_dir : Path
+        Directory where raw files will be written
+    connections : int
+        Number of concurrent connections to the stream (>= 2)
+    interval_ms : int
+        Depth update interval (Binance supports 100ms)
+    passthrough : bool
+        See record_depth
+    writer_thread : bool
+        See record_depth
+    ws_base : str
+        See record_depth
+    writer_config : WriterConfig, optional
+        See record_depth
+    """
+    writer_config = writer_config if writer_config is not None else WriterConfig()
+    if connections < 2:
+        raise ValueError("redundant capture needs connections >= 2")
+
+    stream = f"{symbol.lower()}@depth@{interval_ms}ms"
+    url = f"{ws_base}/{stream}"
+
+    q: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAX)
+    writer_task = asyncio.create_task(
+        writer_loop(
+            out_dir=out_dir,
+            filename_fn=minute_filename,
+            bucket_sec=ROTATE_GRANULARITY_SEC,
+            queue=q,
+            threaded=writer_thread,
+            config=writer_config,
+        )
+    )
+
+    deduper = UpdateDeduper()
+    conn_ids = itertools.count(1)
+    slots = [SlotStats(slot=i) for i in range(connections)]
+    stats_path = out_dir / STATS_FILENAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats_task = asyncio.create_task(_stats_loop(stats_path, symbol, slots))
+
+    try:
+        await asyncio.gather(*(
+            _record_slot(
+                stats=stats,
+                conn_ids=conn_ids,
+                url=url,
+                stream=stream,
+                symbol=symbol,
+                q=q,
+                deduper=deduper,
+                passthrough=passthrough,
+                framed=writer_config.framed,
+                latency_stats=writer_config.latency_stats,
+            )
+            for stats in slots
+        ))
+    finally:
+        # graceful shutdown
+        stats_task.cancel()
+        write_stats(stats_path, symbol, slots)
+        await q.put(None)
+        await writer_task
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# =========================
+# CONFIG
+# =========================
+
+# none      flush() only; the OS writes back whenever it likes (default)
+# interval  group commit: flushed files are fsynced every FSYNC_INTERVAL_SEC
+# rotate    a file is fsynced once, when it is finalized
+DURABILITY_POLICIES = ("none", "interval", "rotate")
+
+FSYNC_INTERVAL_SEC = 1.0
+
+
+# =========================
+# HELPERS
+# =========================
+
+def datasync(fd: int) -> None:
+    """fdatasync where available (skips metadata like mtime), else fsync."""
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def fsync_dir(path: Path) -> None:
+    """Persist directory entries (e.g. a rename) in path."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# =========================
+# SYNCER
+# =========================
+
+class Syncer:
+    """
+    Runs a writer's fsyncs on a background thread, off the write path.
+
+    The writer registers each file when it opens it; the syncer keeps its
+    own dup of the descriptor, so the writer can close the file at any
+    time. With the "interval" policy every file flushed since the last
+    pass is synced once per FSYNC_INTERVAL_SEC, so one fsync covers all
+    flushes in the window.
+
+    Finalizing is handed over too (finalize()): under both policies the
+    .tmp is synced, then renamed to its final name, then its directory is
+    synced, all on the syncer thread. A file therefore only ever appears
+    under its final name with its data on disk; after a crash an
+    unfinished one is still a .tmp for startup recovery.
+
+    Data is durable at most one interval (plus the sync time) after it
+    is flushed; finalized files shortly after finalize().
+    """
+
+    def __init__(self, policy: str, *, stats=None, interval_sec: float = FSYNC_INTERVAL_SEC):
+        if policy not in ("interval", "rotate"):
+            raise ValueError(f"Syncer policy must be 'interval' or 'rotate', got {policy!r}")
+        self.policy = policy
+        self.interval_sec = interval_sec
+        self.stats = stats
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.dirty: Set[int] = set()
+        self.finalized: List[Tuple[int, Path, Path]] = []
+        # Final paths whose rename has not happened yet.
+        self.renaming: Set[Path] = set()
+        self.stopping = False
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name="fsync", daemon=True)
+        self.thread.start()
+
+    def register(self, fd: int) -> int:
+        """Start tracking an open file; returns the handle for flushed/closed."""
+        return os.dup(fd)
+
+    def flushed(self, handle: int) -> None:
+        if self.policy == "interval":
+            with self.lock:
+                self.dirty.add(handle)
+
+    def finalize(self, handle: int, tmp_path: Path, final_path: Path) -> None:
+        """The file was closed; sync it, rename tmp_path to final_path and sync the directory."""
+        with self.lock:
+            self.dirty.discard(handle)
+            self.finalized.append((handle, tmp_path, final_path))
+            self.renaming.add(final_path)
+        self.wake.set()
+
+    def is_renaming(self, final_path: Path) -> bool:
+        """True while final_path was handed to finalize() but not renamed yet."""
+        with self.lock:
+            return final_path in self.renaming
+
+    def check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"fsync failed: {self.error!r}") from self.error
+
+    def _sync_pass(self) -> None:
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            finalized, self.finalized = self.finalized, []
+        if not dirty and not finalized:
+            return
+
+        t0 = time.perf_counter()
+        n = 0
+        for fd in dirty:
+            datasync(fd)
+            n += 1
+        dirs: Dict[Path, None] = {}
+        for fd, tmp_path, final_path in finalized:
+            try:
+                datasync(fd)
+            finally:
+                os.close(fd)
+            n += 1
+            tmp_path.replace(final_path)
+            with self.lock:
+                self.renaming.discard(final_path)
+            dirs[final_path.parent] = None
+        for directory in dirs:
+            fsync_dir(directory)
+            n += 1
+        if self.stats is not None:
+            self.stats.record_fsync(n, time.perf_counter() - t0)
+
+    def _run(self) -> None:
+        timeout = self.interval_sec if self.policy == "interval" else None
+        try:
+            while not self.stopping:
+                self.wake.wait(timeout)
+                self.wake.clear()
+                self._sync_pass()
+        except BaseException as e:
+            self.error = e
+
+    def close(self) -> None:
+        """Stop the thread after a final pass (blocking); raises if any fsync failed."""
+        self.stopping = True
+        self.wake.set()
+        self.thread.join()
+        if self.error is None:
+            self._sync_pass()
+        self.check()
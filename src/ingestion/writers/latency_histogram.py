@@ -0,0 +1,101 @@
+from typing import Dict, Optional
+
+# =========================
+# CONFIG
+# =========================
+
+# Values below 2**PRECISION_BITS are exact; above, buckets keep the top
+# PRECISION_BITS bits, i.e. under 1/2**(PRECISION_BITS - 1) relative error.
+PRECISION_BITS = 7
+
+PERCENTILES = (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p999", 0.999))
+
+
+# =========================
+# HISTOGRAM
+# =========================
+
+def bucket_floor(v: int) -> int:
+    """Lowest value sharing v's bucket."""
+    shift = v.bit_length() - PRECISION_BITS
+    if shift <= 0:
+        return v
+    return (v >> shift) << shift
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of integer latencies.
+
+    Counts are kept sparsely by bucket floor, so histograms from several
+    minutes can be merged exactly. Negative samples (clock skew between
+    exchange and local time) are counted separately and recorded as 0.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max = 0
+        self.negative = 0
+
+    def record(self, v: int) -> None:
+        if v < 0:
+            self.negative += 1
+            v = 0
+        b = bucket_floor(v)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.total += 1
+        self.sum += v
+        if self.min is None or v < self.min:
+            self.min = v
+        if v > self.max:
+            self.max = v
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for b, c in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + c
+        self.total += other.total
+        self.sum += other.sum
+        self.negative += other.negative
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    @classmethod
+    def from_summary(cls, summary: dict) -> "LatencyHistogram":
+        """Rebuild a histogram from summary() output (sum from mean * count)."""
+        h = cls()
+        h.counts = {int(b): c for b, c in summary["counts"].items()}
+        h.total = summary["count"]
+        h.sum = round(summary["mean"] * h.total) if h.total else 0
+        h.min = summary["min"]
+        h.max = summary["max"] or 0
+        h.negative = summary["negative"]
+        return h
+
+    def percentile(self, q: float) -> Optional[int]:
+        """Bucket floor holding the q-quantile (upper-bounded by max)."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(b, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        out = {
+            "count": self.total,
+            "min": self.min,
+            "max": self.max if self.total else None,
+            "mean": self.sum / self.total if self.total else None,
+            "negative": self.negative,
+        }
+        for name, q in PERCENTILES:
+            out[name] = self.percentile(q)
+        out["counts"] = {str(b): self.counts[b] for b in sorted(self.counts)}
+        return out
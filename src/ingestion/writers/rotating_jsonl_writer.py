@@ -1,9 +1,19 @@
 import asyncio
+import json
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from queue import Empty, SimpleQueue
+from typing import Dict, List, Optional, Tuple
 
+from src.ingestion.writers.durability import DURABILITY_POLICIES, Syncer
+from src.ingestion.writers.latency_histogram import LatencyHistogram
+from src.utils.compression import CODEC_SUFFIX, compress_stream, resolve_codec
+from src.utils.framing import FILE_HEADER, FRAMES_SUFFIX, build_frames_index, file_header, frame_index_fields
+from src.utils.record_index import RecordIndex, build_index, index_filename
+from src.utils.segments import segment_name
+from src.utils.tmp_recovery import recover_orphans
 
 # =========================
 # CONFIG
@@ -12,6 +22,36 @@ from typing import Optional
 BATCH_SIZE = 2000
 FLUSH_INTERVAL_SEC = 0.5
 
+# Threaded backend: items handed to the writer thread but not yet written.
+# Past this the loop stops draining the asyncio queue, so a stalled disk
+# still surfaces as QueueFull in the recorder instead of unbounded memory.
+THREAD_MAX_PENDING = 100_000
+THREAD_BACKPRESSURE_POLL_SEC = 0.01
+
+# Upper bound on items taken from the queue per wakeup; the loop yields
+# between batches so a deep backlog cannot starve ws.recv() and pings.
+DRAIN_MAX_ITEMS = 10_000
+
+# writer_loop ticks the writer this often even when no items arrive, so
+# buffered lines are flushed within FLUSH_INTERVAL_SEC + TICK_INTERVAL_SEC.
+TICK_INTERVAL_SEC = 0.25
+
+# With bucket_sec set, a bucket is finalized by the tick once wall-clock
+# time is this far past its end, without waiting for the next bucket's
+# first item. This is also the grace window during which open_buckets > 1
+# keeps an earlier bucket's file open for late items; items arriving
+# after it go to a late segment file (see src.utils.segments).
+ROTATE_GRACE_SEC = 5.0
+
+# "jsonl": items are newline-terminated lines. "frames": items are
+# length-prefixed records (src.utils.framing.encode_frame) and each file
+# starts with the versioned frames header.
+FRAMINGS = ("jsonl", "frames")
+
+# Latency sidecars are rewritten at most this often while a bucket is open,
+# and once more when it is finalized.
+STATS_SIDECAR_INTERVAL_SEC = 10.0
+
 
 # =========================
 # DATA MODEL
@@ -21,19 +61,222 @@ FLUSH_INTERVAL_SEC = 0.5
 class WriteItem:
     bucket: int
     line: bytes
+    # Latency timestamps, set by recorders that track latency stats.
+    event_ts_ms: Optional[int] = None
+    recv_ts_ns: Optional[int] = None
+    enqueue_ts_ns: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class WriterConfig:
+    """
+    File options of a RotatingJSONLWriter, passed unchanged from the
+    recorders through writer_loop and WriterThread.
+
+    Parameters
+    ----------
+    latency_stats : bool
+        Keep per-bucket latency histograms of timestamped items and
+        write them to a <stem>.stats.json sidecar next to each file
+    compression : str, optional
+        "zstd" or "gzip": compress each file as it is written; finals
+        are named <filename>.zst / <filename>.gz (zstd falls back to
+        gzip when zstandard is not installed)
+    compression_level : int, optional
+        Codec level (defaults: zstd 3, gzip 6)
+    durability : str
+        "none" (flush only), "interval" (group-commit fsync of flushed
+        files every FSYNC_INTERVAL_SEC) or "rotate" (fsync each file
+        when finalized); fsyncs run on a Syncer thread, never on the
+        write path, and with either policy the Syncer also does the
+        final rename, between the file's fsync and its directory's
+    index_every : int, optional
+        Write a <stem>.idx record index next to each finalized file
+        with an entry every index_every lines (see
+        src.utils.record_index)
+    framing : str
+        "jsonl" (default) or "frames": items are encoded records and
+        files are named <name without .jsonl>.frames, each starting
+        with the frames file header
+    open_buckets : int
+        Maximum number of bucket files open at once. With the default
+        of 1 a file is finalized as soon as an item for another bucket
+        arrives. Above 1, an item for a new bucket finalizes the oldest
+        open bucket's file only once this many are open, so clock
+        jitter at a bucket boundary or a late delta from a lagging
+        connection appends to the earlier file instead of finalizing
+        it and starting a late segment; with bucket_sec, tick()
+        finalizes each file ROTATE_GRACE_SEC after its bucket ends
+    """
+
+    latency_stats: bool = False
+    compression: Optional[str] = None
+    compression_level: Optional[int] = None
+    durability: str = "none"
+    index_every: Optional[int] = None
+    framing: str = "jsonl"
+    open_buckets: int = 1
+
+    def __post_init__(self):
+        if self.durability not in DURABILITY_POLICIES:
+            raise ValueError(f"unknown durability {self.durability!r}; expected one of {DURABILITY_POLICIES}")
+        if self.framing not in FRAMINGS:
+            raise ValueError(f"unknown framing {self.framing!r}; expected one of {FRAMINGS}")
+        if self.open_buckets < 1:
+            raise ValueError("open_buckets must be >= 1")
+
+    @property
+    def framed(self) -> bool:
+        return self.framing == "frames"
+
+
+@dataclass
+class WriterStats:
+    """Throughput counters for one writer."""
+
+    items: int = 0
+    batches: int = 0
+    max_batch: int = 0
+    bytes_written: int = 0
+    fsyncs: int = 0
+    fsync_sec: float = 0.0
+    max_fsync_pass_sec: float = 0.0
+    started_at: float = field(default_factory=time.time)
+
+    def record_batch(self, n: int) -> None:
+        self.items += n
+        self.batches += 1
+        if n > self.max_batch:
+            self.max_batch = n
+
+    def record_fsync(self, n: int, elapsed: float) -> None:
+        self.fsyncs += n
+        self.fsync_sec += elapsed
+        if elapsed > self.max_fsync_pass_sec:
+            self.max_fsync_pass_sec = elapsed
+
+    def summary(self) -> str:
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        out = (
+            f"{self.items} items in {self.batches} batches (max {self.max_batch}), "
+            f"{self.bytes_written / 1e6:.1f} MB, {self.items / elapsed:.0f} items/s"
+        )
+        if self.fsyncs:
+            out += (
+                f", {self.fsyncs} fsyncs in {self.fsync_sec:.2f}s "
+                f"(max pass {self.max_fsync_pass_sec * 1000:.1f} ms)"
+            )
+        return out
+
+
+# =========================
+# LATENCY SIDECAR
+# =========================
+
+def stats_filename(name: str) -> str:
+    """deltas_utcmin_<bucket>[.<segment>].jsonl -> deltas_utcmin_<bucket>.stats.json (shared by late segments)"""
+    return name.split(".", 1)[0] + ".stats.json"
+
+
+class BucketLatency:
+    """
+    Latency histograms (microseconds) for the items of one bucket.
+
+    event_to_recv    exchange event time E -> recv_ts_ns (includes clock skew)
+    recv_to_enqueue  recv_ts_ns -> handed to the writer queue
+    enqueue_to_flush queued -> bytes flushed to the OS
+
+    A bucket's late segments share its sidecar: load() picks up the
+    counts written so far, and files lists every file they cover.
+    """
+
+    def __init__(self):
+        self.event_to_recv = LatencyHistogram()
+        self.recv_to_enqueue = LatencyHistogram()
+        self.enqueue_to_flush = LatencyHistogram()
+        self.unflushed: List[int] = []
+        self.files: List[str] = []
+
+    @classmethod
+    def load(cls, path: Path) -> "BucketLatency":
+        state = json.loads(path.read_text())
+        lat = cls()
+        lat.event_to_recv = LatencyHistogram.from_summary(state["event_to_recv"])
+        lat.recv_to_enqueue = LatencyHistogram.from_summary(state["recv_to_enqueue"])
+        lat.enqueue_to_flush = LatencyHistogram.from_summary(state["enqueue_to_flush"])
+        lat.files = [state["file"], *state.get("late_files", [])]
+        return lat
+
+    def on_write(self, item: WriteItem) -> None:
+        if item.enqueue_ts_ns is None:
+            return
+        self.event_to_recv.record((item.recv_ts_ns - item.event_ts_ms * 1_000_000) // 1000)
+        self.recv_to_enqueue.record((item.enqueue_ts_ns - item.recv_ts_ns) // 1000)
+        self.unflushed.append(item.enqueue_ts_ns)
+
+    def on_flush(self) -> None:
+        now = time.time_ns()
+        for t in self.unflushed:
+            self.enqueue_to_flush.record((now - t) // 1000)
+        self.unflushed.clear()
+
+    def write_sidecar(self, path: Path, *, final: bool) -> None:
+        state = {"file": self.files[0]}
+        if len(self.files) > 1:
+            state["late_files"] = self.files[1:]
+        state.update({
+            "final": final,
+            "updated_at_unix": int(time.time()),
+            "unit": "us",
+            "event_to_recv": self.event_to_recv.summary(),
+            "recv_to_enqueue": self.recv_to_enqueue.summary(),
+            "enqueue_to_flush": self.enqueue_to_flush.summary(),
+        })
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(state, indent=2))
+        tmp.replace(path)
 
 
 # =========================
 # WRITER
 # =========================
 
+class BucketFile:
+    """An open bucket's .tmp file and its per-file state."""
+
+    def __init__(self, bucket: int, tmp_path: Path, final_path: Path):
+        self.bucket = bucket
+        self.tmp_path = tmp_path
+        self.final_path = final_path
+        self.fp = None
+        self.buffer: List[bytes] = []
+        self.sync_handle: Optional[int] = None
+        self.index: Optional[RecordIndex] = None
+        self.latency: Optional[BucketLatency] = None
+        self.last_sidecar = time.time()
+
+
 class RotatingJSONLWriter:
     """
     One file per UTC time bucket.
     Uses .tmp files + atomic rename to ensure finalized outputs.
+    With compression the .tmp is a growing zstd/gzip stream; each flush
+    ends a compressed block, so everything flushed can be decompressed.
+    Up to open_buckets files are kept open at once, so items arriving
+    slightly out of bucket order append to their still-open file.
+    Finalized files are never modified: items for a bucket whose file is
+    already finalized go to a new late segment file (src.utils.segments).
     """
 
-    def __init__(self, out_dir: Path, *, filename_fn):
+    def __init__(
+        self,
+        out_dir: Path,
+        *,
+        filename_fn,
+        stats: Optional[WriterStats] = None,
+        bucket_sec: Optional[int] = None,
+        config: Optional[WriterConfig] = None,
+    ):
         """
         Parameters
         ----------
@@ -41,77 +284,410 @@ class RotatingJSONLWriter:
             Directory to write files into
         filename_fn : callable
             Function mapping bucket -> filename
+        stats : WriterStats, optional
+            Counters to update (a fresh one is created if omitted)
+        bucket_sec : int, optional
+            Bucket length in seconds of epoch time (bucket b covers
+            [b * bucket_sec, (b + 1) * bucket_sec)); lets tick() finalize
+            a bucket once it is over
+        config : WriterConfig, optional
+            Compression, durability, index, framing, latency sidecar and
+            open-bucket options (defaults if omitted)
         """
+        config = config if config is not None else WriterConfig()
         self.out_dir = out_dir
         self.filename_fn = filename_fn
-        self.current_bucket: Optional[int] = None
-        self.fp = None
-        self.tmp_path: Optional[Path] = None
-        self.final_path: Optional[Path] = None
-        self.buffer = []
+        self.config = config
+        self.compression = resolve_codec(config.compression) if config.compression else None
+        self.compression_level = config.compression_level
+        self.bucket_sec = bucket_sec
+        self.stats = stats if stats is not None else WriterStats()
+        self.syncer = Syncer(config.durability, stats=self.stats) if config.durability != "none" else None
+        self.latency_stats = config.latency_stats
+        self.index_every = config.index_every
+        self.framed = config.framed
+        self.open_buckets = config.open_buckets
+        # Open files by bucket.
+        self.files: Dict[int, BucketFile] = {}
+        self.current: Optional[BucketFile] = None
         self.last_flush = time.time()
 
-    def _open_for_bucket(self, bucket: int) -> None:
+    def _open_for_bucket(self, bucket: int) -> BucketFile:
         self.out_dir.mkdir(parents=True, exist_ok=True)
         name = self.filename_fn(bucket)
-        self.final_path = self.out_dir / name
-        self.tmp_path = self.out_dir / f"{name}.tmp"
-        self.fp = self.tmp_path.open("ab", buffering=1024 * 1024)
-        self.current_bucket = bucket
+        if self.framed:
+            name = name.removesuffix(".jsonl") + FRAMES_SUFFIX
+        if self.compression:
+            name += CODEC_SUFFIX[self.compression]
+        segment = 0
+        while self._finalized(self.out_dir / segment_name(name, segment)):
+            segment += 1
+        if segment:
+            # Bucket already finalized (by tick(), eviction or an earlier
+            # run) and possibly processed downstream: leave it alone.
+            print(f"[writer] {name} already finalized; writing late items to {segment_name(name, segment)}")
+        seg_name = segment_name(name, segment)
+        f = BucketFile(bucket, self.out_dir / f"{seg_name}.tmp", self.out_dir / seg_name)
+        new_file = not f.tmp_path.exists()
+        if self.index_every:
+            if not new_file:
+                build = build_frames_index if self.framed else build_index
+                f.index = build(f.tmp_path, self.index_every)
+            elif self.framed:
+                f.index = RecordIndex(self.index_every, scan=frame_index_fields)
+                f.index.bytes = FILE_HEADER.size
+            else:
+                f.index = RecordIndex(self.index_every)
+        f.fp = f.tmp_path.open("ab", buffering=1024 * 1024)
+        if self.syncer is not None:
+            f.sync_handle = self.syncer.register(f.fp.fileno())
+        if self.compression:
+            f.fp = compress_stream(f.fp, self.compression, self.compression_level)
+        if self.framed and new_file:
+            f.fp.write(file_header())
+        if self.latency_stats:
+            sidecar = self.out_dir / stats_filename(name)
+            f.latency = BucketLatency.load(sidecar) if segment and sidecar.exists() else BucketLatency()
+            f.latency.files.append(seg_name)
+        return f
+
+    def _finalized(self, final_path: Path) -> bool:
+        # Ask the syncer first: once it stops renaming, the file exists.
+        if self.syncer is not None and self.syncer.is_renaming(final_path):
+            return True
+        return final_path.exists()
+
+    def _file_for(self, bucket: int) -> BucketFile:
+        """The open file for bucket, opening it (and finalizing the oldest bucket if full)."""
+        f = self.files.get(bucket)
+        if f is not None:
+            return f
+        while len(self.files) >= self.open_buckets:
+            # Oldest, not least recently written: a late item for an older
+            # bucket must not keep it open at the expense of a newer one.
+            self._finalize(self.files[min(self.files)])
+        f = self.files[bucket] = self._open_for_bucket(bucket)
+        return f
+
+    def _write_sidecar(self, f: BucketFile, *, final: bool) -> None:
+        f.latency.write_sidecar(self.out_dir / stats_filename(f.final_path.name), final=final)
+
+    def _finalize(self, f: BucketFile) -> None:
+        if f.buffer:
+            self._write_buffer(f)
+
+        f.fp.flush()
+        if f.latency is not None:
+            f.latency.on_flush()
+        f.fp.close()
+        if self.syncer is not None:
+            self.syncer.finalize(f.sync_handle, f.tmp_path, f.final_path)
+        else:
+            f.tmp_path.replace(f.final_path)
+        if f.index is not None:
+            f.index.write(self.out_dir / index_filename(f.final_path.name))
+        if f.latency is not None:
+            self._write_sidecar(f, final=True)
+
+        del self.files[f.bucket]
+        if self.current is f:
+            self.current = None
 
     def _close_and_finalize(self) -> None:
-        if self.fp is None:
-            return
+        """Finalize every open file, oldest bucket first."""
+        for bucket in sorted(self.files):
+            self._finalize(self.files[bucket])
 
-        if self.buffer:
-            self.fp.write(b"".join(self.buffer))
-            self.buffer.clear()
+    def _write_buffer(self, f: BucketFile) -> None:
+        blob = b"".join(f.buffer)
+        f.fp.write(blob)
+        self.stats.bytes_written += len(blob)
+        f.buffer.clear()
 
-        self.fp.flush()
-        self.fp.close()
-        self.tmp_path.replace(self.final_path)
+    def _flush_file(self, f: BucketFile, now: float) -> None:
+        self._write_buffer(f)
+        f.fp.flush()
+        if self.syncer is not None:
+            self.syncer.flushed(f.sync_handle)
+        if f.latency is not None:
+            f.latency.on_flush()
+            if now - f.last_sidecar >= STATS_SIDECAR_INTERVAL_SEC:
+                self._write_sidecar(f, final=False)
+                f.last_sidecar = now
 
-        self.fp = None
-        self.current_bucket = None
-        self.tmp_path = None
-        self.final_path = None
+    def _flush(self, now: float) -> None:
+        if self.syncer is not None:
+            self.syncer.check()
+        for f in self.files.values():
+            if f.buffer:
+                self._flush_file(f, now)
+        self.last_flush = now
+
+    def _maybe_flush(self) -> None:
+        now = time.time()
+        if (now - self.last_flush) >= FLUSH_INTERVAL_SEC or any(
+            len(f.buffer) >= BATCH_SIZE for f in self.files.values()
+        ):
+            self._flush(now)
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """
+        Time-driven housekeeping, called periodically regardless of writes.
+
+        Finalizes every open file whose bucket ended ROTATE_GRACE_SEC
+        before `now` (needs bucket_sec), then flushes buffered lines older
+        than FLUSH_INTERVAL_SEC.
+        """
+        if not self.files:
+            return
+        now = time.time() if now is None else now
+        if self.bucket_sec is not None:
+            for f in list(self.files.values()):
+                if now >= (f.bucket + 1) * self.bucket_sec + ROTATE_GRACE_SEC:
+                    self._finalize(f)
+        if now - self.last_flush >= FLUSH_INTERVAL_SEC and any(f.buffer for f in self.files.values()):
+            self._flush(now)
 
     def write(self, item: WriteItem) -> None:
-        if self.current_bucket is None or item.bucket != self.current_bucket:
+        f = self.current
+        if f is None or item.bucket != f.bucket:
+            f = self.current = self._file_for(item.bucket)
+
+        f.buffer.append(item.line)
+        if f.latency is not None:
+            f.latency.on_write(item)
+        if f.index is not None:
+            f.index.add_line(item.line)
+        self.stats.record_batch(1)
+        self._maybe_flush()
+
+    def write_batch(self, items: List[WriteItem]) -> None:
+        """Write many items in order with a single flush check at the end."""
+        if not items:
+            return
+        f = self.current
+        if self.latency_stats or self.index_every:
+            for item in items:
+                if f is None or item.bucket != f.bucket:
+                    f = self._file_for(item.bucket)
+                f.buffer.append(item.line)
+                if f.latency is not None:
+                    f.latency.on_write(item)
+                if f.index is not None:
+                    f.index.add_line(item.line)
+        else:
+            bucket = f.bucket if f is not None else None
+            buffer = f.buffer if f is not None else None
+            for item in items:
+                if item.bucket != bucket:
+                    f = self._file_for(item.bucket)
+                    bucket = item.bucket
+                    buffer = f.buffer
+                buffer.append(item.line)
+        self.current = f
+        self.stats.record_batch(len(items))
+        self._maybe_flush()
+
+    def close(self) -> None:
+        try:
             self._close_and_finalize()
-            self._open_for_bucket(item.bucket)
+        finally:
+            if self.syncer is not None:
+                self.syncer.close()
 
-        self.buffer.append(item.line)
 
-        now = time.time()
-        if len(self.buffer) >= BATCH_SIZE or (now - self.last_flush) >= FLUSH_INTERVAL_SEC:
-            self.fp.write(b"".join(self.buffer))
-            self.fp.flush()
-            self.buffer.clear()
-            self.last_flush = now
+class WriterThread:
+    """
+    RotatingJSONLWriter driven by a dedicated thread.
+
+    Batches are handed over through a SimpleQueue, so the submitting event
+    loop never blocks on write/flush/close/rename. The thread also calls
+    tick() every TICK_INTERVAL_SEC, including while the inbox is empty.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        *,
+        filename_fn,
+        stats: Optional[WriterStats] = None,
+        bucket_sec: Optional[int] = None,
+        config: Optional[WriterConfig] = None,
+    ):
+        self.writer = RotatingJSONLWriter(
+            out_dir,
+            filename_fn=filename_fn,
+            stats=stats,
+            bucket_sec=bucket_sec,
+            config=config,
+        )
+        self.inbox: SimpleQueue = SimpleQueue()
+        self.submitted = 0
+        self.completed = 0
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name=f"writer:{out_dir}", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        last_tick = time.monotonic()
+        try:
+            while True:
+                try:
+                    batch = self.inbox.get(timeout=TICK_INTERVAL_SEC)
+                except Empty:
+                    batch = []
+                if batch is None:
+                    break
+                self.writer.write_batch(batch)
+                self.completed += len(batch)
+                if time.monotonic() - last_tick >= TICK_INTERVAL_SEC:
+                    self.writer.tick()
+                    last_tick = time.monotonic()
+        except BaseException as e:
+            self.error = e
+        finally:
+            try:
+                self.writer.close()
+            except BaseException as e:
+                if self.error is None:
+                    self.error = e
+
+    def check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"writer thread failed: {self.error!r}") from self.error
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.completed
+
+    def submit(self, batch: List[WriteItem]) -> None:
+        self.check()
+        self.inbox.put(batch)
+        self.submitted += len(batch)
 
     def close(self) -> None:
-        self._close_and_finalize()
+        """Finalize the open buckets and stop the thread (blocking)."""
+        self.inbox.put(None)
+        self.thread.join()
+        self.check()
 
 
 # =========================
 # ASYNC LOOP
 # =========================
 
+def _drain(queue: asyncio.Queue, first: Optional[WriteItem]) -> Tuple[List[WriteItem], bool]:
+    """
+    `first` plus whatever is already queued, up to DRAIN_MAX_ITEMS.
+
+    Returns (batch, stop); stop is True once the None sentinel was taken.
+    task_done() is called for everything taken, sentinel included.
+    """
+    batch = []
+    item = first
+    try:
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= DRAIN_MAX_ITEMS:
+                return batch, False
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return batch, False
+        return batch, True
+    finally:
+        for _ in range(len(batch) + (item is None)):
+            queue.task_done()
+
+
 async def writer_loop(
     *,
     out_dir: Path,
     filename_fn,
     queue: asyncio.Queue,
+    threaded: bool = False,
+    stats: Optional[WriterStats] = None,
+    bucket_sec: Optional[int] = None,
+    config: Optional[WriterConfig] = None,
 ) -> None:
-    writer = RotatingJSONLWriter(out_dir, filename_fn=filename_fn)
+    """
+    Drain `queue` into minute files until a None sentinel arrives.
+
+    Each wakeup takes every item already queued and writes it as one
+    batch. With threaded=True all file I/O runs on a WriterThread and this
+    coroutine only forwards batches, so disk stalls cannot delay ws.recv()
+    or ping handling on the event loop. Pass `stats` to observe
+    throughput while the loop runs; a summary is printed on exit.
+    The writer is ticked every TICK_INTERVAL_SEC, so quiet periods still
+    flush buffered lines and, given bucket_sec, finalize each bucket
+    ROTATE_GRACE_SEC after it ends. bucket_sec and config are passed to
+    RotatingJSONLWriter.
+
+    On startup, .tmp files left in out_dir by a previous writer are
+    recovered first (see tmp_recovery.recover_orphans), so a restart
+    never appends to a torn last line. out_dir must not be shared with
+    another running writer.
+    """
+    stats = stats if stats is not None else WriterStats()
+    await asyncio.to_thread(recover_orphans, out_dir, min_age_sec=0)
+    try:
+        if threaded:
+            worker = WriterThread(
+                out_dir,
+                filename_fn=filename_fn,
+                stats=stats,
+                bucket_sec=bucket_sec,
+                config=config,
+            )
+            await _threaded_writer_loop(worker, queue)
+        else:
+            writer = RotatingJSONLWriter(
+                out_dir,
+                filename_fn=filename_fn,
+                stats=stats,
+                bucket_sec=bucket_sec,
+                config=config,
+            )
+            await _inline_writer_loop(writer, queue)
+    finally:
+        print(f"[writer] {out_dir}: {stats.summary()}")
+
+
+async def _tick_loop(writer: RotatingJSONLWriter) -> None:
+    while True:
+        await asyncio.sleep(TICK_INTERVAL_SEC)
+        writer.tick()
+
+
+async def _inline_writer_loop(writer: RotatingJSONLWriter, queue: asyncio.Queue) -> None:
+    ticker = asyncio.create_task(_tick_loop(writer))
     try:
         while True:
-            item = await queue.get()
-            if item is None:
-                queue.task_done()
+            batch, stop = _drain(queue, await queue.get())
+            if ticker.done():
+                ticker.result()
+            writer.write_batch(batch)
+            if stop:
                 break
-            writer.write(item)
-            queue.task_done()
+            if len(batch) >= DRAIN_MAX_ITEMS:
+                await asyncio.sleep(0)
     finally:
+        ticker.cancel()
         writer.close()
+
+
+async def _threaded_writer_loop(worker: WriterThread, queue: asyncio.Queue) -> None:
+    try:
+        while True:
+            batch, stop = _drain(queue, await queue.get())
+            while worker.pending >= THREAD_MAX_PENDING:
+                worker.check()
+                await asyncio.sleep(THREAD_BACKPRESSURE_POLL_SEC)
+            if batch:
+                worker.submit(batch)
+            if stop:
+                break
+            if len(batch) >= DRAIN_MAX_ITEMS:
+                await asyncio.sleep(0)
+    finally:
+        await asyncio.to_thread(worker.close)
@@ -0,0 +1,111 @@
+import shutil
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict
+
+# =========================
+# SCHEMA
+# =========================
+
+# One row per price level, bids before asks within each delta.
+LEVEL_COLUMNS = ("price", "qty", "side", "delta")
+
+# One row per delta as (column, normalized key); "delta" in the level
+# columns indexes these rows. U/u get distinct names so the files do not
+# collide on case-insensitive filesystems.
+DELTA_FIELDS = (
+    ("recv_ts_ns", "recv_ts_ns"),
+    ("event_ts_ns", "event_ts_ns"),
+    ("first_update_id", "U"),
+    ("final_update_id", "u"),
+    ("conn_id", "conn_id"),
+)
+DELTA_COLUMNS = tuple(col for col, _ in DELTA_FIELDS)
+
+SIDE_BID = 0
+SIDE_ASK = 1
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_ALIGN = 64
+
+
+# =========================
+# .NPY ENCODING
+# =========================
+
+def write_npy(path: Path, values: array) -> None:
+    """
+    Write a 1-D int64 array as a version 1.0 .npy file.
+
+    Uses only the stdlib, so producers do not need NumPy; readers can
+    np.load(path, mmap_mode="r") without parsing any text.
+    """
+    if values.typecode != "q":
+        raise ValueError(f"expected int64 array, got typecode {values.typecode!r}")
+
+    header = "{'descr': '<i8', 'fortran_order': False, 'shape': (%d,), }" % len(values)
+    pad = -(len(NPY_MAGIC) + 2 + len(header) + 1) % NPY_ALIGN
+    header_bytes = (header + " " * pad + "\n").encode("latin1")
+
+    if sys.byteorder != "little":
+        values = array("q", values)
+        values.byteswap()
+
+    with path.open("wb") as f:
+        f.write(NPY_MAGIC)
+        f.write(len(header_bytes).to_bytes(2, "little"))
+        f.write(header_bytes)
+        values.tofile(f)
+
+
+# =========================
+# ACCUMULATOR
+# =========================
+
+class ColumnarDeltas:
+    """
+    Flat int64 columns for one minute of normalized deltas.
+
+    Written as <out_dir>/<column>.npy into a .tmp directory that is
+    renamed into place once every column is on disk.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {
+            name: array("q") for name in LEVEL_COLUMNS + DELTA_COLUMNS
+        }
+
+    def append(self, d: dict) -> None:
+        cols = self.columns
+        delta = len(cols["recv_ts_ns"])
+
+        for side, levels in ((SIDE_BID, d["b"]), (SIDE_ASK, d["a"])):
+            n = len(levels)
+            cols["price"].extend(p for p, _ in levels)
+            cols["qty"].extend(q for _, q in levels)
+            cols["side"].extend((side,) * n)
+            cols["delta"].extend((delta,) * n)
+
+        for col, key in DELTA_FIELDS:
+            cols[col].append(d[key])
+
+    def write(self, out_dir: Path) -> None:
+        tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        for name, values in self.columns.items():
+            write_npy(tmp_dir / f"{name}.npy", values)
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        tmp_dir.replace(out_dir)
+
+
+def load_columnar(minute_dir: Path, *, mmap: bool = True) -> dict:
+    """Load every column of a minute directory as NumPy arrays (memory-mapped by default)."""
+    import numpy as np
+
+    mode = "r" if mmap else None
+    return {
+        name: np.load(minute_dir / f"{name}.npy", mmap_mode=mode)
+        for name in LEVEL_COLUMNS + DELTA_COLUMNS
+    }
@@ -1,12 +1,23 @@
 import json
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from decimal import Decimal, getcontext
+from functools import lru_cache
+from heapq import heapify, heappop, heappush
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import orjson
 
+from src.pipelines.columnar import ColumnarDeltas
+from src.utils.compression import open_raw
+from src.utils.framing import FRAMES_SUFFIX, iter_frame_lines
+from src.utils.record_index import RecordIndex, index_filename
+from src.utils.segments import segment_name, segment_of
+from src.utils.tmp_recovery import recover_orphans
+
 # =========================
 # CONFIG (SCHEMA-LEVEL)
 # =========================
@@ -14,6 +25,9 @@ import orjson
 PRICE_SCALE = 10**8
 QTY_SCALE = 10**8
 
+# Upper bound on interned (string, scale) conversions; LRU-evicted.
+FP_CACHE_SIZE = 1 << 16
+
 getcontext().prec = 50
 
 
@@ -25,8 +39,44 @@ def to_fp(x: str, scale: int) -> int:
     return int((Decimal(x) * scale).to_integral_exact())
 
 
+# Digit strings longer than this always take the Decimal path, so the
+# 50-digit context can never round differently from the fast path.
+FAST_FP_MAX_DIGITS = 32
+
+_POW10 = tuple(10**i for i in range(FAST_FP_MAX_DIGITS + 1))
+_SCALE_DIGITS: Dict[int, int] = {
+    10**i: i for i in range(FAST_FP_MAX_DIGITS + 1)
+}
+
+
+def parse_fp(x: str, scale: int) -> int:
+    """
+    String/integer-only equivalent of to_fp.
+
+    Handles str unsigned plain decimals ("92743.00", "0.031", "5.", ".5")
+    whose fractional digits fit a power-of-ten scale. Everything else
+    (non-str values such as JSON numbers, signs, exponents, whitespace,
+    NaN/Infinity, rounding, other scales, garbage) is delegated to to_fp,
+    so results and raised exceptions are identical.
+    """
+    digits = _SCALE_DIGITS.get(scale)
+    if digits is not None and type(x) is str:
+        int_part, _, frac = x.partition(".")
+        n = len(frac)
+        s = int_part + frac
+        if n <= digits and len(s) <= FAST_FP_MAX_DIGITS and s.isdigit() and s.isascii():
+            return int(s) * _POW10[digits - n]
+    return to_fp(x, scale)
+
+
+@lru_cache(maxsize=FP_CACHE_SIZE)
+def cached_fp(x: str, scale: int) -> int:
+    """parse_fp behind a bounded LRU intern cache keyed by (x, scale)."""
+    return parse_fp(x, scale)
+
+
 def normalize_level(level: list) -> Tuple[int, int]:
-    return to_fp(level[0], PRICE_SCALE), to_fp(level[1], QTY_SCALE)
+    return cached_fp(level[0], PRICE_SCALE), cached_fp(level[1], QTY_SCALE)
 
 
 # =========================
@@ -70,29 +120,80 @@ def normalize_delta(raw: dict) -> dict:
 # =========================
 
 class TopBook:
+    """
+    Full L2 levels with O(log n) best bid/ask.
+
+    Sizes live in dicts keyed by price. Each side also keeps a heap of
+    prices (bids negated) with lazy deletion: entries for removed levels
+    are discarded only when they surface at the top, and the heap is
+    rebuilt from the dict once stale entries outnumber live ones.
+    """
+
+    # Rebuild a heap once it exceeds live levels by this factor (+ slack).
+    COMPACT_RATIO = 2
+    COMPACT_SLACK = 64
+
     def __init__(self):
         self.bids: Dict[int, int] = {}
         self.asks: Dict[int, int] = {}
+        self._bid_heap: List[int] = []
+        self._ask_heap: List[int] = []
+
+    @classmethod
+    def from_levels(cls, bids: Iterable[list], asks: Iterable[list]) -> "TopBook":
+        book = cls()
+        book.apply({"b": bids, "a": asks})
+        return book
+
+    def levels(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Live (price, qty) levels per side, sorted by price."""
+        return sorted(self.bids.items()), sorted(self.asks.items())
 
     def apply(self, d: dict) -> None:
+        bids, bid_heap = self.bids, self._bid_heap
         for p, q in d["b"]:
             if q == 0:
-                self.bids.pop(p, None)
+                bids.pop(p, None)
             else:
-                self.bids[p] = q
+                if p not in bids:
+                    heappush(bid_heap, -p)
+                bids[p] = q
 
+        asks, ask_heap = self.asks, self._ask_heap
         for p, q in d["a"]:
             if q == 0:
-                self.asks.pop(p, None)
+                asks.pop(p, None)
             else:
-                self.asks[p] = q
+                if p not in asks:
+                    heappush(ask_heap, p)
+                asks[p] = q
+
+        limit = self.COMPACT_RATIO * len(bids) + self.COMPACT_SLACK
+        if len(bid_heap) > limit:
+            self._bid_heap = [-p for p in bids]
+            heapify(self._bid_heap)
+
+        limit = self.COMPACT_RATIO * len(asks) + self.COMPACT_SLACK
+        if len(ask_heap) > limit:
+            self._ask_heap = list(asks)
+            heapify(self._ask_heap)
 
     def best(self) -> Optional[Tuple[int, int, int, int]]:
-        if not self.bids or not self.asks:
+        bids, asks = self.bids, self.asks
+        if not bids or not asks:
             return None
-        best_bid = max(self.bids)
-        best_ask = min(self.asks)
-        return best_bid, self.bids[best_bid], best_ask, self.asks[best_ask]
+
+        bid_heap = self._bid_heap
+        while -bid_heap[0] not in bids:
+            heappop(bid_heap)
+
+        ask_heap = self._ask_heap
+        while ask_heap[0] not in asks:
+            heappop(ask_heap)
+
+        best_bid = -bid_heap[0]
+        best_ask = ask_heap[0]
+        return best_bid, bids[best_bid], best_ask, asks[best_ask]
 
 
 def mid_fp(bid: int, ask: int) -> int:
@@ -121,127 +222,698 @@ class Audit:
     continuity_ok: bool = True
     gaps: int = 0
     first_gap: Optional[dict] = None
+    fp_cache_hits: int = 0
+    fp_cache_misses: int = 0
+
 
+def continuity_ok(prev_u: Optional[int], U: int, u: int, pu: Optional[int] = None) -> bool:
+    """
+    Whether a delta follows on from the previous one.
 
-def continuity_ok(prev_u: Optional[int], U: int, u: int) -> bool:
+    Futures deltas carry pu (the previous delta's u) and must chain on it
+    exactly. Files recorded without pu fall back to the spot rule
+    U <= prev_u + 1 <= u.
+    """
     if prev_u is None:
         return True
+    if pu is not None:
+        return pu == prev_u
     return U <= prev_u + 1 <= u
 
 
+# =========================
+# BOOK CHECKPOINTS
+# =========================
+
+def minute_of(raw_file: Path) -> int:
+    """UTC minute bucket encoded in a deltas_utcmin_<bucket>.* filename."""
+    return int(raw_file.name.split(".", 1)[0].rsplit("_", 1)[1])
+
+
+def checkpoint_path(checkpoint_dir: Path, stem: str) -> Path:
+    return checkpoint_dir / f"{stem}.book.json"
+
+
+def resume_checkpoint(checkpoint_dir: Path, raw_file: Path) -> Path:
+    """
+    Checkpoint raw_file's book resumes from (it may not exist).
+
+    A late segment (src.utils.segments) continues from the previous
+    segment of its minute; a minute file from the last segment of the
+    previous minute that has been checkpointed so far.
+    """
+    bucket, segment = minute_of(raw_file), segment_of(raw_file)
+    if segment:
+        return checkpoint_dir / segment_name(f"deltas_utcmin_{bucket}.book.json", segment - 1)
+    prev = sorted(checkpoint_dir.glob(f"deltas_utcmin_{bucket - 1}.*book.json"), key=segment_of)
+    return prev[-1] if prev else checkpoint_path(checkpoint_dir, f"deltas_utcmin_{bucket - 1}")
+
+
+def write_checkpoint(path: Path, book: TopBook, prev_u: Optional[int]) -> None:
+    """Book state at the end of a minute, written via .tmp + atomic rename."""
+    bids, asks = book.levels()
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(orjson.dumps({"prev_u": prev_u, "b": bids, "a": asks}))
+    tmp.replace(path)
+
+
+def load_checkpoint(path: Path) -> Tuple[TopBook, Optional[int]]:
+    state = orjson.loads(path.read_bytes())
+    return TopBook.from_levels(state["b"], state["a"]), state["prev_u"]
+
+
+# =========================
+# DEPTH SNAPSHOTS
+# =========================
+
+def list_snapshots(snapshot_dir: Path) -> List[Tuple[int, Path]]:
+    """(lastUpdateId, path) of recorder REST snapshots, oldest first."""
+    out = []
+    for p in snapshot_dir.glob("snapshot_*.json"):
+        try:
+            out.append((int(p.stem.rsplit("_", 1)[1]), p))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def load_snapshot(path: Path) -> Tuple[TopBook, int]:
+    """
+    Book and lastUpdateId from a recorder REST snapshot.
+
+    To replay from it, skip deltas with u < lastUpdateId; the first
+    applied delta must have U <= lastUpdateId <= u, and later deltas
+    chain on pu as usual.
+    """
+    snap = orjson.loads(path.read_bytes())
+    bids = [normalize_level(l) for l in snap["b"]]
+    asks = [normalize_level(l) for l in snap["a"]]
+    return TopBook.from_levels(bids, asks), snap["lastUpdateId"]
+
+
 # =========================
 # CORE PROCESSOR
 # =========================
 
-def list_raw_files(raw_dir: Path) -> List[Path]:
-    return sorted(p for p in raw_dir.glob("deltas_utcmin_*.jsonl") if p.is_file())
+RAW_PATTERNS = (
+    "deltas_utcmin_*.jsonl", "deltas_utcmin_*.jsonl.zst", "deltas_utcmin_*.jsonl.gz",
+    "deltas_utcmin_*.frames", "deltas_utcmin_*.frames.zst", "deltas_utcmin_*.frames.gz",
+)
 
 
-def process_raw_dir(raw_dir: Path) -> None:
-    raw_dir = raw_dir.resolve()
+def raw_order(raw_file: Path) -> Tuple[int, int]:
+    """Sort key: minute, then late segment (segment 10 after segment 9)."""
+    return minute_of(raw_file), segment_of(raw_file)
+
+
+def list_raw_files(raw_dir: Path, exclude: Iterable[str] = ()) -> List[Path]:
+    """
+    Finalized raw minute files and their late segments, JSONL or
+    length-prefixed frames, plain or compressed (see open_raw), in
+    raw_order.
+
+    Names in exclude are skipped before they are statted.
+    """
+    exclude = exclude if isinstance(exclude, (set, frozenset)) else set(exclude)
+    return sorted(
+        (
+            p for pattern in RAW_PATTERNS for p in raw_dir.glob(pattern)
+            if p.name not in exclude and p.is_file()
+        ),
+        key=raw_order,
+    )
+
+
+def raw_stem(raw_file: Path) -> str:
+    """deltas_utcmin_<bucket>[.<segment>].{jsonl,frames}[.zst|.gz] -> deltas_utcmin_<bucket>[.<segment>]"""
+    name = raw_file.name
+    for ext in (".jsonl", FRAMES_SUFFIX):
+        if ext in name:
+            return name.split(ext, 1)[0]
+    return name
+
+
+def iter_raw_lines(raw_file: Path) -> Iterator[bytes]:
+    """
+    Recorder lines of a raw minute file.
+
+    .frames files are decoded record by record into the JSONL line each
+    record stands for (see src.utils.framing.frame_line), so both
+    formats normalize identically.
+    """
+    if FRAMES_SUFFIX in raw_file.name:
+        yield from iter_frame_lines(raw_file)
+        return
+    with open_raw(raw_file) as fin:
+        yield from fin
+
+
+class MinuteNormalizer:
+    """
+    Normalization state for one raw minute file.
+
+    Lines are fed one at a time, so the same logic serves whole-file
+    batch runs and incremental tailing of a file still being written.
+    begin() opens the outputs, finish() finalizes the checkpoint,
+    columnar and audit sidecars, and abort() closes without them.
+    """
+
+    def __init__(
+        self,
+        raw_file: Path,
+        norm_dir: Path,
+        prices_dir: Path,
+        audit_dir: Path,
+        checkpoint_dir: Optional[Path] = None,
+        columnar_dir: Optional[Path] = None,
+        index_every: Optional[int] = None,
+    ):
+        stem = raw_stem(raw_file)
+        self.raw_file = raw_file
+        self.norm_file = norm_dir / f"{stem}.fp.jsonl"
+        self.prices_file = prices_dir / f"{stem}.prices.jsonl"
+        self.audit_file = audit_dir / f"{stem}.audit.json"
+
+        self.ckpt_in: Optional[Path] = None
+        self.ckpt_out: Optional[Path] = None
+        if checkpoint_dir is not None:
+            self.ckpt_in = resume_checkpoint(checkpoint_dir, raw_file)
+            self.ckpt_out = checkpoint_path(checkpoint_dir, stem)
+
+        self.col_out: Optional[Path] = None
+        if columnar_dir is not None:
+            self.col_out = columnar_dir / stem
+
+        self.index_every = index_every
+        self.index_file: Optional[Path] = None
+        if index_every:
+            self.index_file = norm_dir / index_filename(self.norm_file.name)
+
+        self.audit = Audit()
+        self.book = TopBook()
+        self.prev_u: Optional[int] = None
+        self.columns: Optional[ColumnarDeltas] = None
+        self.index: Optional[RecordIndex] = None
+        self.fnorm = None
+        self.fpx = None
+
+    def is_done(self) -> bool:
+        return (
+            self.norm_file.exists()
+            and self.prices_file.exists()
+            and self.audit_file.exists()
+            and (self.ckpt_out is None or self.ckpt_out.exists())
+            and (self.col_out is None or self.col_out.exists())
+            and (self.index_file is None or self.index_file.exists())
+        )
+
+    def begin(self) -> None:
+        if self.ckpt_in is not None:
+            if self.ckpt_in.exists():
+                self.book, self.prev_u = load_checkpoint(self.ckpt_in)
+            else:
+                self.ckpt_in = None
+        if self.col_out is not None:
+            self.columns = ColumnarDeltas()
+        if self.index_file is not None:
+            self.index = RecordIndex(self.index_every)
+        self._cache_before = cached_fp.cache_info()
+        self.fnorm = self.norm_file.open("wb")
+        self.fpx = self.prices_file.open("wb")
+
+    def feed(self, line: bytes) -> None:
+        audit = self.audit
+        audit.raw_lines += 1
+
+        try:
+            raw = orjson.loads(line)
+        except Exception:
+            audit.bad_json += 1
+            return
+
+        if not is_depth_delta(raw):
+            audit.skipped_schema += 1
+            return
+
+        try:
+            d = normalize_delta(raw)
+        except Exception:
+            audit.normalize_errors += 1
+            return
+
+        audit.kept_lines += 1
+
+        prev_u = self.prev_u
+        # pu only feeds the continuity check; it is not part of the
+        # normalized record.
+        U, u, pu = d["U"], d["u"], raw.get("pu")
+        if not continuity_ok(prev_u, U, u, pu):
+            audit.continuity_ok = False
+            audit.gaps += 1
+            if audit.first_gap is None:
+                audit.first_gap = {
+                    "prev_u": prev_u,
+                    "U": U,
+                    "u": u,
+                    "line": audit.raw_lines,
+                }
+                if pu is not None:
+                    audit.first_gap["pu"] = pu
+            self.prev_u = None
+        else:
+            self.prev_u = u
+
+        out = orjson.dumps(d) + b"\n"
+        self.fnorm.write(out)
+        if self.index is not None:
+            self.index.add(len(out), d["recv_ts_ns"], d["event_ts_ns"], u)
+        if self.columns is not None:
+            self.columns.append(d)
+
+        book = self.book
+        book.apply(d)
+        best = book.best()
+        if best is None:
+            return
+
+        bid, bid_sz, ask, ask_sz = best
+        px = {
+            "exchange": d["exchange"],
+            "symbol": d["symbol"],
+            "recv_ts_ns": d["recv_ts_ns"],
+            "event_ts_ns": d["event_ts_ns"],
+            "best_bid": bid,
+            "bid_sz": bid_sz,
+            "best_ask": ask,
+            "ask_sz": ask_sz,
+            "mid": mid_fp(bid, ask),
+            "micro": micro_fp(bid, bid_sz, ask, ask_sz),
+            "price_scale": PRICE_SCALE,
+            "qty_scale": QTY_SCALE,
+        }
+        self.fpx.write(orjson.dumps(px) + b"\n")
+
+    def flush(self) -> None:
+        self.fnorm.flush()
+        self.fpx.flush()
+
+    def abort(self) -> None:
+        for f in (self.fnorm, self.fpx):
+            if f is not None:
+                f.close()
+        self.fnorm = self.fpx = None
+
+    def discard(self) -> None:
+        """Abort and remove the partial normalized/prices outputs."""
+        self.abort()
+        self.norm_file.unlink(missing_ok=True)
+        self.prices_file.unlink(missing_ok=True)
+
+    def finish(self) -> None:
+        self.abort()
+
+        audit = self.audit
+        cache_after = cached_fp.cache_info()
+        audit.fp_cache_hits = cache_after.hits - self._cache_before.hits
+        audit.fp_cache_misses = cache_after.misses - self._cache_before.misses
+
+        if self.ckpt_out is not None:
+            write_checkpoint(self.ckpt_out, self.book, self.prev_u)
+        if self.columns is not None:
+            self.columns.write(self.col_out)
+        if self.index is not None:
+            self.index.write(self.index_file)
+
+        report = {
+            "raw_file": str(self.raw_file),
+            "normalized_file": str(self.norm_file),
+            "prices_file": str(self.prices_file),
+            "created_at_unix": int(time.time()),
+            "stats": audit.__dict__,
+        }
+        if self.col_out is not None:
+            report["columnar_dir"] = str(self.col_out)
+        if self.ckpt_out is not None:
+            report["checkpoint_in"] = str(self.ckpt_in) if self.ckpt_in is not None else None
+            report["checkpoint_out"] = str(self.ckpt_out)
+
+        with self.audit_file.open("w", encoding="utf-8") as fa:
+            json.dump(report, fa, indent=2)
+
+
+def process_raw_file(
+    raw_file: Path,
+    norm_dir: Path,
+    prices_dir: Path,
+    audit_dir: Path,
+    checkpoint_dir: Optional[Path] = None,
+    columnar_dir: Optional[Path] = None,
+    index_every: Optional[int] = None,
+) -> Optional[Tuple[int, float]]:
+    """
+    Normalize one raw minute file into its normalized/prices/audit outputs.
+
+    Returns (raw_lines, elapsed_sec), or None when all outputs already
+    exist and the file is skipped. Module-level so it can run in a
+    worker process.
+
+    With checkpoint_dir set, the book and continuity state resume from
+    the previous minute's checkpoint (if present) and the state at the
+    end of this minute is checkpointed for the next one.
+
+    With columnar_dir set, the normalized deltas are also written as flat
+    int64 .npy columns under columnar_dir/<stem>/.
+
+    With index_every set, a <stem>.fp.idx record index of the normalized
+    file is written next to it (see src.utils.record_index).
+    """
+    m = MinuteNormalizer(
+        raw_file, norm_dir, prices_dir, audit_dir, checkpoint_dir, columnar_dir, index_every
+    )
+    if m.is_done():
+        return None
+
+    t0 = time.perf_counter()
+    m.begin()
+    try:
+        for line in iter_raw_lines(raw_file):
+            m.feed(line)
+    except BaseException:
+        m.abort()
+        raise
+    m.finish()
+
+    return m.audit.raw_lines, time.perf_counter() - t0
+
+
+def process_chain(
+    raw_files: List[Path],
+    norm_dir: Path,
+    prices_dir: Path,
+    audit_dir: Path,
+    checkpoint_dir: Optional[Path] = None,
+    columnar_dir: Optional[Path] = None,
+    index_every: Optional[int] = None,
+) -> List[Optional[Tuple[int, float]]]:
+    """process_raw_file over consecutive minutes in order (one carry chain)."""
+    return [
+        process_raw_file(f, norm_dir, prices_dir, audit_dir, checkpoint_dir, columnar_dir, index_every)
+        for f in raw_files
+    ]
+
+
+def carry_chains(raw_files: List[Path], checkpoint_dir: Path) -> List[List[Path]]:
+    """
+    Split sorted raw minute files into chains that can run independently.
+
+    A chain starts at every file whose predecessor (see resume_checkpoint)
+    either has no raw file (a recorder gap, so the minute starts from an
+    empty book) or already has a checkpoint (it is seeded from it).
+    Within a chain each file needs the previous one's checkpoint, so it
+    runs in order. Running the chains in parallel gives the same outputs
+    as one serial pass.
+    """
+    chains: List[List[Path]] = []
+    prev: Optional[Path] = None
+    for f in raw_files:
+        bucket, segment = raw_order(f)
+        adjacent = prev is not None and (
+            raw_order(prev) == (bucket, segment - 1)
+            or (segment == 0 and minute_of(prev) == bucket - 1)
+        )
+        if not adjacent or checkpoint_path(checkpoint_dir, raw_stem(prev)).exists():
+            chains.append([])
+        chains[-1].append(f)
+        prev = f
+    return chains
+
+
+def _prepare_output_dirs(
+    raw_dir: Path,
+    *,
+    carry_book: bool,
+    columnar: bool,
+) -> Tuple[Path, Path, Path, Optional[Path], Optional[Path]]:
     base = raw_dir.parent
 
     norm_dir = base / "normalized"
     prices_dir = base / "prices"
     audit_dir = base / "audit"
+    checkpoint_dir = base / "checkpoints" if carry_book else None
+    columnar_dir = base / "columnar" if columnar else None
 
-    norm_dir.mkdir(parents=True, exist_ok=True)
-    prices_dir.mkdir(parents=True, exist_ok=True)
-    audit_dir.mkdir(parents=True, exist_ok=True)
+    for d in (norm_dir, prices_dir, audit_dir, checkpoint_dir, columnar_dir):
+        if d is not None:
+            d.mkdir(parents=True, exist_ok=True)
 
-    for raw_file in list_raw_files(raw_dir):
-        stem = raw_file.stem
+    return norm_dir, prices_dir, audit_dir, checkpoint_dir, columnar_dir
 
-        norm_file = norm_dir / f"{stem}.fp.jsonl"
-        prices_file = prices_dir / f"{stem}.prices.jsonl"
-        audit_file = audit_dir / f"{stem}.audit.json"
 
-        if norm_file.exists() and prices_file.exists() and audit_file.exists():
-            continue
+def process_raw_dir(
+    raw_dir: Path,
+    *,
+    workers: int = 1,
+    carry_book: bool = False,
+    columnar: bool = False,
+    recover: bool = False,
+    index_every: Optional[int] = None,
+) -> None:
+    """
+    Normalize every finalized minute file in raw_dir.
 
-        audit = Audit()
-        book = TopBook()
-        prev_u: Optional[int] = None
-
-        with (
-            raw_file.open("rb") as fin,
-            norm_file.open("wb") as fnorm,
-            prices_file.open("wb") as fpx,
-        ):
-            for line in fin:
-                audit.raw_lines += 1
-
-                try:
-                    raw = orjson.loads(line)
-                except Exception:
-                    audit.bad_json += 1
-                    continue
-
-                if not is_depth_delta(raw):
-                    audit.skipped_schema += 1
-                    continue
-
-                try:
-                    d = normalize_delta(raw)
-                except Exception:
-                    audit.normalize_errors += 1
-                    continue
-
-                audit.kept_lines += 1
-
-                U, u = d["U"], d["u"]
-                if not continuity_ok(prev_u, U, u):
-                    audit.continuity_ok = False
-                    audit.gaps += 1
-                    if audit.first_gap is None:
-                        audit.first_gap = {
-                            "prev_u": prev_u,
-                            "U": U,
-                            "u": u,
-                            "line": audit.raw_lines,
-                        }
-                    prev_u = None
-                else:
-                    prev_u = u
-
-                fnorm.write(orjson.dumps(d) + b"\n")
-
-                book.apply(d)
-                best = book.best()
-                if best is None:
-                    continue
-
-                bid, bid_sz, ask, ask_sz = best
-                px = {
-                    "exchange": d["exchange"],
-                    "symbol": d["symbol"],
-                    "recv_ts_ns": d["recv_ts_ns"],
-                    "event_ts_ns": d["event_ts_ns"],
-                    "best_bid": bid,
-                    "bid_sz": bid_sz,
-                    "best_ask": ask,
-                    "ask_sz": ask_sz,
-                    "mid": mid_fp(bid, ask),
-                    "micro": micro_fp(bid, bid_sz, ask, ask_sz),
-                    "price_scale": PRICE_SCALE,
-                    "qty_scale": QTY_SCALE,
-                }
-                fpx.write(orjson.dumps(px) + b"\n")
-
-        with audit_file.open("w", encoding="utf-8") as fa:
-            json.dump(
-                {
-                    "raw_file": str(raw_file),
-                    "normalized_file": str(norm_file),
-                    "prices_file": str(prices_file),
-                    "created_at_unix": int(time.time()),
-                    "stats": audit.__dict__,
-                },
-                fa,
-                indent=2,
+    Late segments (src.utils.segments) are normalized as files of their
+    own, e.g. deltas_utcmin_X.1.jsonl -> normalized/deltas_utcmin_X.1.fp.jsonl,
+    so outputs of an already processed minute never change.
+
+    With workers > 1 the files are spread across a process pool. Each
+    file is independent, so outputs are identical to the serial run.
+
+    With carry_book, book state is checkpointed per minute under
+    checkpoints/ and each minute resumes from the previous one, so a
+    restarted run resumes from the last checkpoint instead of replaying
+    history. With workers > 1 the minutes are split into carry_chains,
+    which run in parallel, each seeded from the checkpoint before its
+    first minute. A fresh contiguous recording is a single chain and
+    still runs serially; gaps and earlier checkpoints (e.g. a restart
+    or a backfill around already-processed minutes) add parallelism.
+
+    With columnar, each minute is also written as int64 .npy columns
+    under columnar/<stem>/ alongside the JSONL outputs.
+
+    With recover, orphaned .tmp files older than ORPHAN_MIN_AGE_SEC are
+    first truncated to their last complete line and finalized (or
+    quarantined), and logged to raw_dir/recovery.jsonl.
+
+    With index_every, each normalized file gets a <stem>.fp.idx record
+    index with an entry every index_every records.
+    """
+    raw_dir = raw_dir.resolve()
+    if recover:
+        recover_orphans(raw_dir)
+    dirs = _prepare_output_dirs(raw_dir, carry_book=carry_book, columnar=columnar)
+
+    raw_files = list_raw_files(raw_dir)
+
+    if carry_book and workers > 1:
+        chains = carry_chains(raw_files, dirs[3])
+        args = (chains, *(repeat(d) for d in dirs), repeat(index_every))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(process_chain, *args)
+            _report_timings(
+                [f for chain in chains for f in chain],
+                (res for chain_results in results for res in chain_results),
             )
+        return
+
+    args = (raw_files, *(repeat(d) for d in dirs), repeat(index_every))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(process_raw_file, *args)
+            _report_timings(raw_files, results)
+    else:
+        _report_timings(raw_files, map(process_raw_file, *args))
+
+
+def _report_timings(
+    raw_files: List[Path],
+    results: Iterable[Optional[Tuple[int, float]]],
+) -> None:
+    for raw_file, res in zip(raw_files, results):
+        if res is None:
+            continue
+        lines, elapsed = res
+        print(f"[normalize] {raw_file.name}: {lines} lines in {elapsed:.3f}s")
 
-def discover_and_process(base_data_dir: Path) -> None:
+
+# =========================
+# LIVE TAIL
+# =========================
+
+TAIL_POLL_SEC = 0.05
+TAIL_READ_SIZE = 1024 * 1024
+
+# A .tmp that has not grown for this long while a newer minute exists was
+# orphaned by the writer (e.g. a crash) and is abandoned by the tailer.
+TAIL_STALE_SEC = 90.0
+
+
+def list_tmp_files(raw_dir: Path) -> List[Path]:
+    return sorted((p for p in raw_dir.glob("deltas_utcmin_*.jsonl.tmp") if p.is_file()), key=raw_order)
+
+
+def _latest_bucket(paths: Iterable[Path]) -> Optional[int]:
+    return max((minute_of(p) for p in paths), default=None)
+
+
+def tail_minute(
+    tmp_file: Path,
+    m: MinuteNormalizer,
+    *,
+    poll_sec: float = TAIL_POLL_SEC,
+) -> bool:
+    """
+    Feed a .jsonl.tmp into m while RotatingJSONLWriter is appending to it.
+
+    Only complete lines are fed; a partial trailing line is held until
+    its newline arrives. Outputs are flushed after every read so
+    downstream readers see records as soon as they are normalized.
+
+    Returns True once the writer has renamed the file to its final name
+    and every byte has been consumed, or False if the file was orphaned
+    (stopped growing for TAIL_STALE_SEC while a newer minute exists) or
+    is gone. If the writer renames it before it is opened, the finalized
+    file is read instead.
+    """
+    final_file = tmp_file.with_suffix("")
+    bucket = minute_of(tmp_file)
+    pending = b""
+    last_growth = time.monotonic()
+
+    try:
+        fin = tmp_file.open("rb")
+    except FileNotFoundError:
+        try:
+            fin = final_file.open("rb")
+        except FileNotFoundError:
+            return False
+
+    with fin:
+        while True:
+            chunk = fin.read(TAIL_READ_SIZE)
+            if chunk:
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    m.feed(line)
+                m.flush()
+                last_growth = time.monotonic()
+                continue
+
+            if not tmp_file.exists() and final_file.exists():
+                # The writer flushes and closes before renaming, so
+                # whatever is left is already readable from our handle.
+                rest = pending + fin.read()
+                lines = rest.split(b"\n")
+                tail = lines.pop()
+                for line in lines:
+                    m.feed(line)
+                if tail:
+                    m.feed(tail)
+                return True
+
+            if time.monotonic() - last_growth > TAIL_STALE_SEC:
+                raw_dir = tmp_file.parent
+                newest = _latest_bucket(list_raw_files(raw_dir) + list_tmp_files(raw_dir))
+                if newest is not None and newest > bucket:
+                    return False
+
+            time.sleep(poll_sec)
+
+
+def tail_raw_dir(
+    raw_dir: Path,
+    *,
+    carry_book: bool = False,
+    columnar: bool = False,
+    poll_sec: float = TAIL_POLL_SEC,
+    index_every: Optional[int] = None,
+) -> None:
+    """
+    Normalize raw_dir continuously, following the minute being recorded.
+
+    Finalized minutes are caught up first (as in process_raw_dir), then
+    the newest .jsonl.tmp beyond them is tailed and normalized/prices
+    records are emitted as lines arrive. When the writer renames it, the
+    minute's audit (and checkpoint/columnar outputs) are finalized and
+    the next minute is picked up. Older orphaned .tmp files are ignored.
+    Compressed recordings (.jsonl.zst/.gz) and .frames recordings are not
+    tailed; each minute is normalized once it is finalized. Runs until interrupted.
+
+    With carry_book the oldest .tmp beyond the finalized minutes is
+    tailed instead: a writer with open_buckets > 1 keeps the previous
+    minute open for a while after the next one starts, and the next
+    minute can only start from the book once the previous one has
+    finalized and written its checkpoint. The next minute is then read
+    from its beginning. Orphaned .tmp files are abandoned once (see
+    tail_minute) and skipped from then on.
+
+    Finalized minutes are remembered by name, so each poll only stats
+    and processes files it has not handled yet.
+    """
+    raw_dir = raw_dir.resolve()
+    dirs = _prepare_output_dirs(raw_dir, carry_book=carry_book, columnar=columnar)
+    seen: Set[str] = set()
+    abandoned: Set[str] = set()
+    done: Optional[int] = None
+
+    while True:
+        raw_files = list_raw_files(raw_dir, exclude=seen)
+        _report_timings(raw_files, (process_raw_file(f, *dirs, index_every) for f in raw_files))
+        seen.update(p.name for p in raw_files)
+        if raw_files:
+            done = max(done or 0, _latest_bucket(raw_files))
+
+        live = [
+            p for p in list_tmp_files(raw_dir)
+            if (done is None or minute_of(p) > done) and p.name not in abandoned
+        ]
+        if not live:
+            time.sleep(poll_sec)
+            continue
+
+        tmp_file = live[0] if carry_book else live[-1]
+        m = MinuteNormalizer(tmp_file.with_suffix(""), *dirs, index_every)
+        t0 = time.perf_counter()
+        m.begin()
+        try:
+            finalized = tail_minute(tmp_file, m, poll_sec=poll_sec)
+        except BaseException:
+            m.abort()
+            raise
+
+        if finalized:
+            m.finish()
+            seen.add(m.raw_file.name)
+            done = max(done or 0, minute_of(m.raw_file))
+            _report_timings(
+                [m.raw_file],
+                [(m.audit.raw_lines, time.perf_counter() - t0)],
+            )
+        else:
+            m.discard()
+            abandoned.add(tmp_file.name)
+            print(f"[normalize] abandoned orphaned {tmp_file.name}")
+
+
+def discover_and_process(
+    base_data_dir: Path,
+    *,
+    workers: int = 1,
+    carry_book: bool = False,
+    columnar: bool = False,
+    recover: bool = False,
+    index_every: Optional[int] = None,
+) -> None:
     """
     Discover and normalize all raw depth directories under:
 
@@ -262,12 +934,78 @@ def discover_and_process(base_data_dir: Path) -> None:
                 continue
 
             print(f"[normalize] {exchange_dir.name}/{symbol_dir.name}")
-            process_raw_dir(raw_dir)
+            process_raw_dir(
+                raw_dir,
+                workers=workers,
+                carry_book=carry_book,
+                columnar=columnar,
+                recover=recover,
+                index_every=index_every,
+            )
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """Legacy entrypoint: normalize data/binance/BTCUSDT/raw in-place."""
+    import argparse
     from pathlib import Path
 
+    parser = argparse.ArgumentParser(description="Normalize raw L2 depth deltas.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Normalize minute files across N worker processes (default: 1, serial).",
+    )
+    parser.add_argument(
+        "--carry-book",
+        action="store_true",
+        help="Carry book state across minutes via per-minute checkpoints "
+        "(with --workers, chains seeded from existing checkpoints run in parallel).",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Also write int64 .npy columns per minute under columnar/.",
+    )
+    parser.add_argument(
+        "--recover-orphans",
+        action="store_true",
+        help="Finalize orphaned .tmp minute files (truncated to the last complete line) before normalizing.",
+    )
+    parser.add_argument(
+        "--index-every",
+        type=int,
+        help="Write a <stem>.fp.idx seek index next to each normalized file, one entry every N records.",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep running and normalize the minute being recorded as it is written "
+        "(.frames and compressed minutes are normalized once finalized).",
+    )
+    args = parser.parse_args(argv)
+
     ROOT = Path(__file__).resolve().parents[2]
-    process_raw_dir(Path(ROOT / 'data/binance/BTCUSDT/raw'))
+    raw_dir = Path(ROOT / 'data/binance/BTCUSDT/raw')
+
+    if args.follow:
+        if args.workers > 1:
+            parser.error("--follow normalizes serially; drop --workers")
+        if args.recover_orphans:
+            recover_orphans(raw_dir)
+        tail_raw_dir(
+            raw_dir,
+            carry_book=args.carry_book,
+            columnar=args.columnar,
+            index_every=args.index_every,
+        )
+        return
+
+    process_raw_dir(
+        raw_dir,
+        workers=args.workers,
+        carry_book=args.carry_book,
+        columnar=args.columnar,
+        recover=args.recover_orphans,
+        index_every=args.index_every,
+    )
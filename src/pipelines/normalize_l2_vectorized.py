@@ -0,0 +1,345 @@
+import gc
+from dataclasses import dataclass
+from itertools import chain, compress
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import orjson
+
+from src.pipelines.normalize_l2 import (
+    PRICE_SCALE,
+    QTY_SCALE,
+    is_depth_delta,
+    iter_raw_lines,
+    normalize_delta,
+    parse_fp,
+)
+
+# =========================
+# CONFIG
+# =========================
+
+# int64 holds 18 decimal digits safely; longer scaled values go through
+# parse_fp one at a time.
+MAX_INT64_DIGITS = 18
+
+INT64_MIN = int(np.iinfo(np.int64).min)
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+_POW10 = 10 ** np.arange(MAX_INT64_DIGITS + 1, dtype=np.int64)
+
+HEADER_FIELDS = ("conn_id", "recv_ts_ns", "event_ts_ms", "U", "u")
+
+
+class _Irregular(Exception):
+    """File shape the bulk path does not handle; use per-delta normalization."""
+
+
+# =========================
+# DATA MODEL
+# =========================
+
+@dataclass
+class DeltaArrays:
+    """
+    One raw minute file as flat arrays, in normalize_delta order.
+
+    Per-delta arrays have one row per kept delta. Levels of delta i are
+    b_price[b_offsets[i]:b_offsets[i + 1]] (likewise for asks).
+    """
+
+    exchange: np.ndarray
+    symbol: np.ndarray
+    conn_id: np.ndarray
+    recv_ts_ns: np.ndarray
+    event_ts_ns: np.ndarray
+    U: np.ndarray
+    u: np.ndarray
+    b_offsets: np.ndarray
+    b_price: np.ndarray
+    b_qty: np.ndarray
+    a_offsets: np.ndarray
+    a_price: np.ndarray
+    a_qty: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.u)
+
+    def iter_deltas(self) -> Iterator[dict]:
+        """Rebuild the normalize_delta dicts (for checks and slow consumers)."""
+        b_off, a_off = self.b_offsets.tolist(), self.a_offsets.tolist()
+        b_px, b_qty = self.b_price.tolist(), self.b_qty.tolist()
+        a_px, a_qty = self.a_price.tolist(), self.a_qty.tolist()
+        for i in range(len(self)):
+            yield {
+                "exchange": str(self.exchange[i]),
+                "symbol": str(self.symbol[i]),
+                "conn_id": int(self.conn_id[i]),
+                "recv_ts_ns": int(self.recv_ts_ns[i]),
+                "event_ts_ns": int(self.event_ts_ns[i]),
+                "U": int(self.U[i]),
+                "u": int(self.u[i]),
+                "b": list(zip(b_px[b_off[i]:b_off[i + 1]], b_qty[b_off[i]:b_off[i + 1]])),
+                "a": list(zip(a_px[a_off[i]:a_off[i + 1]], a_qty[a_off[i]:a_off[i + 1]])),
+            }
+
+
+# =========================
+# BULK FIXED-POINT
+# =========================
+
+def bulk_fp(strings: List[str], scale: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert decimal strings to fixed point in bulk.
+
+    The strings are joined into one newline-separated ASCII buffer and
+    validated with array operations: each token must be digits with at
+    most one dot, at most `scale` fractional digits, and fit int64 once
+    scaled. Valid tokens are parsed by NumPy's text reader with the dots
+    stripped, then shifted by their missing fractional digits.
+
+    Returns (fp, ok). Elements with ok == False have fp 0 and must be
+    converted by the caller with parse_fp.
+    """
+    n = len(strings)
+    digits = len(str(scale)) - 1
+    fp = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=bool)
+    if n == 0 or scale != 10**digits or digits > MAX_INT64_DIGITS:
+        return fp, ok
+
+    try:
+        blob = "\n".join(strings).encode("ascii")
+    except UnicodeEncodeError:
+        return fp, ok
+
+    buf = np.frombuffer(blob + b"\n", dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    if len(ends) != n:
+        # Some string contained a newline itself.
+        return fp, ok
+
+    lengths = np.diff(ends, prepend=-1) - 1
+
+    dot_idx = np.flatnonzero(buf == ord("."))
+    dot_tok = np.searchsorted(ends, dot_idx)
+    n_dots = np.bincount(dot_tok, minlength=n)
+    dot_at = np.full(n, -1, dtype=np.int64)
+    dot_at[dot_tok] = dot_idx
+    n_frac = np.where(n_dots > 0, ends - dot_at - 1, 0)
+    n_digits = lengths - n_dots
+
+    ok = (
+        (n_dots <= 1)
+        & (n_digits > 0)
+        & (n_frac <= digits)
+        & (n_digits + (digits - n_frac) <= MAX_INT64_DIGITS)
+    )
+
+    # Anything but digits, '.' and the separators invalidates its token.
+    other = (buf < ord("0")) | (buf > ord("9"))
+    other &= (buf != ord(".")) & (buf != ord("\n"))
+    if other.any():
+        ok[np.searchsorted(ends, np.flatnonzero(other))] = False
+
+    n_ok = int(ok.sum())
+    if n_ok == 0:
+        return fp, ok
+    if n_ok < n:
+        blob = "\n".join(compress(strings, ok.tolist())).encode("ascii")
+
+    ints = np.fromstring(blob.replace(b".", b""), dtype=np.int64, sep="\n")
+    if len(ints) != n_ok:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+
+    fp[ok] = ints * _POW10[digits - n_frac[ok]]
+    return fp, ok
+
+
+# =========================
+# FILE NORMALIZATION
+# =========================
+
+def _side_arrays(
+    raws: List[dict],
+    key: str,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Offsets, price, qty and a per-delta 'failed' mask for one side."""
+    sides = [r[key] for r in raws]
+    if set(map(type, sides)) - {list}:
+        raise _Irregular(key)
+
+    counts = np.fromiter(map(len, sides), dtype=np.int64, count=len(sides))
+    offsets = np.zeros(len(sides) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    flat = list(chain.from_iterable(sides))
+    failed = np.zeros(len(sides), dtype=bool)
+    if not flat:
+        empty = np.zeros(0, dtype=np.int64)
+        return offsets, empty, empty, failed
+
+    if set(map(type, flat)) != {list} or set(map(len, flat)) != {2}:
+        raise _Irregular(key)
+    strings = list(chain.from_iterable(flat))
+    if set(map(type, strings)) != {str}:
+        raise _Irregular(key)
+
+    price_str, qty_str = strings[0::2], strings[1::2]
+    price, price_ok = bulk_fp(price_str, PRICE_SCALE)
+    qty, qty_ok = bulk_fp(qty_str, QTY_SCALE)
+
+    owner = np.repeat(np.arange(len(sides)), counts)
+    for values, fp, ok, scale in (
+        (price_str, price, price_ok, PRICE_SCALE),
+        (qty_str, qty, qty_ok, QTY_SCALE),
+    ):
+        for i in np.flatnonzero(~ok).tolist():
+            try:
+                v = parse_fp(values[i], scale)
+            except Exception:
+                failed[owner[i]] = True
+                continue
+            if not INT64_MIN <= v <= INT64_MAX:
+                raise ValueError(f"{key} level {values[i]!r} does not fit int64 at scale {scale}")
+            fp[i] = v
+
+    return offsets, price, qty, failed
+
+
+def _bulk(raws: List[dict]) -> DeltaArrays:
+    for k in HEADER_FIELDS:
+        if set(type(r[k]) for r in raws) - {int}:
+            raise _Irregular(k)
+
+    try:
+        header = {
+            k: np.fromiter((r[k] for r in raws), dtype=np.int64, count=len(raws))
+            for k in HEADER_FIELDS
+        }
+    except OverflowError:
+        raise _Irregular("header")
+    if len(raws) and header["event_ts_ms"].max() > INT64_MAX // 1_000_000:
+        raise _Irregular("event_ts_ms")
+
+    b_off, b_px, b_qty, b_failed = _side_arrays(raws, "b")
+    a_off, a_px, a_qty, a_failed = _side_arrays(raws, "a")
+
+    keep = ~(b_failed | a_failed)
+    b_off, b_px, b_qty = _select(keep, b_off, b_px, b_qty)
+    a_off, a_px, a_qty = _select(keep, a_off, a_px, a_qty)
+
+    kept = [r for r, k in zip(raws, keep.tolist()) if k]
+    return DeltaArrays(
+        exchange=np.array([r["exchange"] for r in kept], dtype=object),
+        symbol=np.array([r["symbol"] for r in kept], dtype=object),
+        conn_id=header["conn_id"][keep],
+        recv_ts_ns=header["recv_ts_ns"][keep],
+        event_ts_ns=header["event_ts_ms"][keep] * 1_000_000,
+        U=header["U"][keep],
+        u=header["u"][keep],
+        b_offsets=b_off,
+        b_price=b_px,
+        b_qty=b_qty,
+        a_offsets=a_off,
+        a_price=a_px,
+        a_qty=a_qty,
+    )
+
+
+def _select(
+    keep: np.ndarray,
+    offsets: np.ndarray,
+    price: np.ndarray,
+    qty: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if keep.all():
+        return offsets, price, qty
+    counts = np.diff(offsets)
+    level_keep = np.repeat(keep, counts)
+    new_offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(counts[keep], out=new_offsets[1:])
+    return new_offsets, price[level_keep], qty[level_keep]
+
+
+def _int64(name: str, values: list) -> np.ndarray:
+    if set(map(type, values)) - {int}:
+        raise ValueError(f"{name} values are not all integers")
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        raise ValueError(f"{name} values do not fit int64")
+
+
+def _from_deltas(deltas: List[dict]) -> DeltaArrays:
+    def side(key):
+        counts = [len(d[key]) for d in deltas]
+        offsets = np.zeros(len(deltas) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        levels = [lv for d in deltas for lv in d[key]]
+        price = _int64(f"{key} price", [p for p, _ in levels])
+        qty = _int64(f"{key} qty", [q for _, q in levels])
+        return offsets, price, qty
+
+    def col(k):
+        return _int64(k, [d[k] for d in deltas])
+
+    b_off, b_px, b_qty = side("b")
+    a_off, a_px, a_qty = side("a")
+    return DeltaArrays(
+        exchange=np.array([d["exchange"] for d in deltas], dtype=object),
+        symbol=np.array([d["symbol"] for d in deltas], dtype=object),
+        conn_id=col("conn_id"),
+        recv_ts_ns=col("recv_ts_ns"),
+        event_ts_ns=col("event_ts_ns"),
+        U=col("U"),
+        u=col("u"),
+        b_offsets=b_off,
+        b_price=b_px,
+        b_qty=b_qty,
+        a_offsets=a_off,
+        a_price=a_px,
+        a_qty=a_qty,
+    )
+
+
+def normalize_file_arrays(raw_file: Path) -> DeltaArrays:
+    """
+    Normalize a whole raw minute file into DeltaArrays in one pass.
+
+    Keeps exactly the deltas process_raw_file keeps (valid JSON, depth
+    schema, normalizable levels). Well-formed files convert all level
+    strings in bulk; files with irregular shapes or types fall back to
+    normalize_delta so results stay identical element for element.
+    Values that cannot be held as int64 raise ValueError.
+    """
+    # Holding a minute of decoded levels creates hundreds of thousands of
+    # acyclic lists; keep the cyclic GC from rescanning them while loading.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        raws = []
+        for line in iter_raw_lines(raw_file):
+            try:
+                raw = orjson.loads(line)
+            except Exception:
+                continue
+            if is_depth_delta(raw):
+                raws.append(raw)
+
+        try:
+            return _bulk(raws)
+        except _Irregular:
+            pass
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    deltas = []
+    for raw in raws:
+        try:
+            deltas.append(normalize_delta(raw))
+        except Exception:
+            continue
+    return _from_deltas(deltas)
@@ -0,0 +1,140 @@
+import gzip
+import io
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+# =========================
+# CODECS
+# =========================
+
+# zstandard is optional; without it "zstd" falls back to gzip.
+CODEC_SUFFIX = {"zstd": ".zst", "gzip": ".gz"}
+SUFFIX_CODEC = {v: k for k, v in CODEC_SUFFIX.items()}
+DEFAULT_LEVEL = {"zstd": 3, "gzip": 6}
+
+
+def resolve_codec(codec: str) -> str:
+    """Codec actually used for a requested one ("zstd" or "gzip")."""
+    if codec not in CODEC_SUFFIX:
+        raise ValueError(f"unknown compression {codec!r}; expected one of {sorted(CODEC_SUFFIX)}")
+    if codec == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("[compression] zstandard not installed; falling back to gzip")
+            return "gzip"
+    return codec
+
+
+def codec_of(path: Path) -> Optional[str]:
+    """Codec of a (possibly .tmp) file from its suffix, None if uncompressed."""
+    if path.suffix == ".tmp":
+        path = path.with_suffix("")
+    return SUFFIX_CODEC.get(path.suffix)
+
+
+def strip_codec_suffix(path: Path) -> Path:
+    """deltas_utcmin_X.jsonl.zst -> deltas_utcmin_X.jsonl (unchanged if not compressed)."""
+    return path.with_suffix("") if path.suffix in SUFFIX_CODEC else path
+
+
+# =========================
+# STREAMS
+# =========================
+
+def compress_stream(raw: BinaryIO, codec: str, level: Optional[int] = None) -> BinaryIO:
+    """
+    Writable stream compressing into `raw` (an open binary file).
+
+    flush() pushes a complete block through to `raw`; close() ends the
+    frame/member and closes `raw`. Appending to an existing file adds a new
+    frame/member, which readers decompress transparently.
+    """
+    level = DEFAULT_LEVEL[codec] if level is None else level
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=True)
+    if codec == "gzip":
+        return _GzipWriter(raw, level)
+    raise ValueError(f"unknown compression {codec!r}")
+
+
+class _GzipWriter:
+    """GzipFile over `raw` that also closes `raw`; flush() is a sync flush."""
+
+    def __init__(self, raw: BinaryIO, level: int):
+        self.raw = raw
+        self.gz = gzip.GzipFile(fileobj=raw, mode="ab", compresslevel=level)
+
+    def write(self, b) -> int:
+        return self.gz.write(b)
+
+    def flush(self) -> None:
+        self.gz.flush()
+        self.raw.flush()
+
+    def close(self) -> None:
+        try:
+            self.gz.close()
+        finally:
+            self.raw.close()
+
+
+def open_raw(path: Path) -> BinaryIO:
+    """Open a raw minute file for reading, decompressing .zst/.gz transparently."""
+    codec = codec_of(path)
+    if codec is None:
+        return path.open("rb")
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(f"{path.name} is zstd-compressed; install the zstandard package to read it")
+    fh = path.open("rb")
+    reader = zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True, closefd=True)
+    return io.BufferedReader(reader)
+
+
+def iter_decompressed(fh: BinaryIO, codec: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Decompressed chunks of a possibly truncated zstd/gzip stream.
+
+    Unlike open_raw this tolerates a stream cut off mid-frame/member (a
+    crashed writer's .tmp): it yields everything decodable and stops at
+    the first incomplete or corrupt data. Concatenated frames/members are
+    followed.
+    """
+    if codec == "zstd":
+        import zstandard
+
+        errors = (zstandard.ZstdError,)
+
+        def new():
+            return zstandard.ZstdDecompressor().decompressobj()
+    elif codec == "gzip":
+        errors = (zlib.error,)
+
+        def new():
+            return zlib.decompressobj(wbits=31)
+    else:
+        raise ValueError(f"unknown compression {codec!r}")
+
+    d = new()
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            return
+        while chunk:
+            try:
+                out = d.decompress(chunk)
+            except errors:
+                return
+            if out:
+                yield out
+            if not d.eof:
+                break
+            chunk = d.unused_data
+            d = new()
@@ -0,0 +1,246 @@
+import io
+import re
+import struct
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple
+
+from src.utils.compression import codec_of, open_raw
+from src.utils.record_index import INDEX_EVERY, KEYS, RecordIndex, index_filename, read_index, seek_offset
+
+# =========================
+# FORMAT
+# =========================
+
+# Length-prefixed alternative to JSONL for raw capture:
+#
+#   file header    magic b"DFRM", version u16, reserved u16
+#   record header  payload_len u32, conn_id u32, recv_ts_ns i64,
+#                  event_ts_ms i64, U i64, u i64, pu i64 (MISSING if absent)
+#   payload        payload_len bytes, the exchange frame as received
+#
+# All little-endian. Readers can filter on record headers and skip
+# payloads without decoding (or, for plain files, reading) them.
+FRAMES_MAGIC = b"DFRM"
+FRAMES_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")
+RECORD_HEADER = struct.Struct("<IIqqqqq")
+MISSING = -1
+
+FRAMES_SUFFIX = ".frames"
+
+
+class FrameHeader(NamedTuple):
+    payload_len: int
+    conn_id: int
+    recv_ts_ns: int
+    event_ts_ms: int
+    U: int
+    u: int
+    pu: int
+
+
+def file_header() -> bytes:
+    return FILE_HEADER.pack(FRAMES_MAGIC, FRAMES_VERSION, 0)
+
+
+def encode_frame(
+    payload: bytes,
+    *,
+    conn_id: int,
+    recv_ts_ns: int,
+    event_ts_ms: int,
+    U: int,
+    u: int,
+    pu: Optional[int] = None,
+) -> bytes:
+    """One record: fixed header followed by the payload bytes."""
+    return RECORD_HEADER.pack(
+        len(payload),
+        conn_id,
+        recv_ts_ns,
+        event_ts_ms,
+        U,
+        u,
+        MISSING if pu is None else pu,
+    ) + payload
+
+
+def frame_index_fields(record: bytes) -> Tuple[int, int, int]:
+    """(recv_ts_ns, event_ts_ns, u) of an encoded record, for RecordIndex."""
+    h = FrameHeader._make(RECORD_HEADER.unpack_from(record))
+    return h.recv_ts_ns, h.event_ts_ms * 1_000_000, h.u
+
+
+def check_file_header(data: bytes, name: str = "frames file") -> None:
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{name}: truncated file header")
+    magic, version, _ = FILE_HEADER.unpack_from(data)
+    if magic != FRAMES_MAGIC:
+        raise ValueError(f"{name}: bad magic {magic!r}")
+    if version != FRAMES_VERSION:
+        raise ValueError(f"{name}: unsupported frames version {version}")
+
+
+def complete_length(data: bytes, start: int = 0) -> int:
+    """End offset of the last complete record in data, walking from start."""
+    pos = start
+    while pos + RECORD_HEADER.size <= len(data):
+        end = pos + RECORD_HEADER.size + RECORD_HEADER.unpack_from(data, pos)[0]
+        if end > len(data):
+            break
+        pos = end
+    return pos
+
+
+# =========================
+# READ
+# =========================
+
+def iter_frames(
+    path: Path,
+    *,
+    where: Optional[Callable[[FrameHeader], bool]] = None,
+    payloads: bool = True,
+    offset: Optional[int] = None,
+) -> Iterator[Tuple[FrameHeader, Optional[bytes]]]:
+    """
+    (header, payload) for each complete record of a .frames[.zst|.gz] file.
+
+    where filters on the header alone; payloads of rejected records (or
+    of all records with payloads=False, yielding None instead) are
+    skipped without being read on plain files, and decompressed but not
+    copied on compressed ones. offset must be a record boundary, e.g.
+    from a record index. A truncated final record (a crashed writer's
+    .tmp) ends the iteration.
+    """
+    plain = codec_of(path) is None
+    size = path.stat().st_size if plain else None
+
+    with open_raw(path) as f:
+        check_file_header(f.read(FILE_HEADER.size), path.name)
+
+        def skip(n: int) -> bool:
+            if plain:
+                return f.seek(n, io.SEEK_CUR) <= size
+            while n > 0:
+                got = len(f.read(min(n, 1024 * 1024)))
+                if not got:
+                    return False
+                n -= got
+            return True
+
+        if offset is not None and offset > FILE_HEADER.size:
+            if not skip(offset - FILE_HEADER.size):
+                return
+        while True:
+            raw = f.read(RECORD_HEADER.size)
+            if len(raw) < RECORD_HEADER.size:
+                return
+            h = FrameHeader._make(RECORD_HEADER.unpack(raw))
+            if where is not None and not where(h):
+                if not skip(h.payload_len):
+                    return
+                continue
+            if not payloads:
+                if not skip(h.payload_len):
+                    return
+                yield h, None
+                continue
+            payload = f.read(h.payload_len)
+            if len(payload) < h.payload_len:
+                return
+            yield h, payload
+
+
+def frames_complete_end(path: Path) -> int:
+    """
+    Byte length of the valid prefix of a plain .frames file.
+
+    Reads only the record headers, seeking over payloads. Raises
+    ValueError if the file header is missing or invalid.
+    """
+    with path.open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        f.seek(0)
+        check_file_header(f.read(FILE_HEADER.size), path.name)
+        pos = FILE_HEADER.size
+        while pos + RECORD_HEADER.size <= size:
+            f.seek(pos)
+            end = pos + RECORD_HEADER.size + RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))[0]
+            if end > size:
+                break
+            pos = end
+    return pos
+
+
+def build_frames_index(path: Path, every: int = INDEX_EVERY) -> RecordIndex:
+    """Record index of an existing .frames file, from its record headers."""
+    idx = RecordIndex(every, scan=frame_index_fields)
+    idx.bytes = FILE_HEADER.size
+    for h, _ in iter_frames(path, payloads=False):
+        idx.add(RECORD_HEADER.size + h.payload_len, h.recv_ts_ns, h.event_ts_ms * 1_000_000, h.u)
+    return idx
+
+
+def iter_frames_from(
+    path: Path,
+    *,
+    key: str,
+    target: int,
+    index_path: Optional[Path] = None,
+    payloads: bool = True,
+) -> Iterator[Tuple[FrameHeader, Optional[bytes]]]:
+    """
+    Records from the first one with key >= target onwards.
+
+    Like record_index.iter_lines_from, but the start is found from record
+    headers only, so no payload before it is decoded.
+    """
+    if key not in KEYS:
+        raise ValueError(f"key must be one of {KEYS}")
+    index_path = index_path if index_path is not None else path.with_name(index_filename(path.name))
+    offset = seek_offset(read_index(index_path), key, target) if index_path.exists() else None
+
+    def value(h: FrameHeader) -> int:
+        return h.event_ts_ms * 1_000_000 if key == "event_ts_ns" else getattr(h, key)
+
+    started = False
+
+    def where(h: FrameHeader) -> bool:
+        nonlocal started
+        started = started or value(h) >= target
+        return started
+
+    yield from iter_frames(path, where=where, payloads=payloads, offset=offset)
+
+
+# =========================
+# JSONL EQUIVALENT
+# =========================
+
+_SYMBOL = re.compile(rb'"s":("[^"]*")')
+
+
+def frame_line(h: FrameHeader, payload: bytes) -> bytes:
+    """
+    The recorder JSONL line a record stands for.
+
+    Same bytes the depth recorder writes in JSONL passthrough mode: the
+    frame with exchange/symbol (the frame's own "s"), conn_id,
+    recv_ts_ns and event_ts_ms spliced in front, so readers of JSONL
+    minute files handle .frames files unchanged.
+    """
+    m = _SYMBOL.search(payload)
+    head = b'{"exchange":"binance","symbol":%b,"conn_id":%d,"recv_ts_ns":%d,"event_ts_ms":%d,' % (
+        m.group(1) if m else b'""',
+        h.conn_id,
+        h.recv_ts_ns,
+        h.event_ts_ms,
+    )
+    return head + payload[1:] + b"\n"
+
+
+def iter_frame_lines(path: Path) -> Iterator[bytes]:
+    """frame_line for each complete record of a .frames[.zst|.gz] file."""
+    for h, payload in iter_frames(path):
+        yield frame_line(h, payload)
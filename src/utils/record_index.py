@@ -0,0 +1,189 @@
+import re
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from src.utils.compression import codec_of, open_raw
+
+# =========================
+# FORMAT
+# =========================
+
+# <stem>.idx next to a JSONL file:
+#   header  magic, version, reserved, every, records, bytes
+#   entries (offset, recv_ts_ns, event_ts_ns, u) for records 0, every, 2*every, ...
+# offset is the byte offset of the record's line in the uncompressed
+# stream; fields a record lacks are stored as MISSING. Little-endian.
+INDEX_MAGIC = b"DIDX"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sHHIQQ")
+ENTRY = struct.Struct("<Qqqq")
+MISSING = -1
+
+# One entry per 50 records: ~5 s of @100ms deltas, 32 bytes each.
+INDEX_EVERY = 50
+
+KEYS = ("recv_ts_ns", "event_ts_ns", "u")
+
+_RECV_RE = re.compile(rb'"recv_ts_ns":(\d+)')
+_EVENT_MS_RE = re.compile(rb'"event_ts_ms":(\d+)')
+_EVENT_NS_RE = re.compile(rb'"event_ts_ns":(\d+)')
+_U_RE = re.compile(rb'"u":(\d+)')
+
+Entry = Tuple[int, int, int, int]
+
+
+def index_filename(name: str) -> str:
+    """deltas_utcmin_X.jsonl[.zst] / .frames[.zst] -> deltas_utcmin_X.idx; X.fp.jsonl -> X.fp.idx"""
+    for ext in (".jsonl", ".frames"):
+        if ext in name:
+            return name.split(ext, 1)[0] + ".idx"
+    return name + ".idx"
+
+
+def scan_index_fields(line: bytes) -> Tuple[int, int, int]:
+    """(recv_ts_ns, event_ts_ns, u) from a raw or normalized line without decoding it."""
+    head = line[:line.find(b'"b":')] if b'"b":' in line else line
+    m = _RECV_RE.search(head)
+    recv = int(m.group(1)) if m else MISSING
+    m = _EVENT_NS_RE.search(head)
+    if m:
+        event = int(m.group(1))
+    else:
+        m = _EVENT_MS_RE.search(head)
+        event = int(m.group(1)) * 1_000_000 if m else MISSING
+    m = _U_RE.search(head)
+    u = int(m.group(1)) if m else MISSING
+    return recv, event, u
+
+
+# =========================
+# BUILD
+# =========================
+
+class RecordIndex:
+    """
+    Sparse index of a record file, built as its records are written.
+
+    scan extracts (recv_ts_ns, event_ts_ns, u) from an encoded record;
+    the default reads JSONL lines.
+    """
+
+    def __init__(
+        self,
+        every: int = INDEX_EVERY,
+        scan: Callable[[bytes], Tuple[int, int, int]] = scan_index_fields,
+    ):
+        if every < 1:
+            raise ValueError("index every must be >= 1")
+        self.every = every
+        self.scan = scan
+        self.records = 0
+        self.bytes = 0
+        self.entries: List[Entry] = []
+
+    def add_line(self, line: bytes) -> None:
+        """Account for the next line (newline included), scanning it if due."""
+        if self.records % self.every == 0:
+            self.entries.append((self.bytes, *self.scan(line)))
+        self.records += 1
+        self.bytes += len(line)
+
+    def add(self, nbytes: int, recv_ts_ns: int, event_ts_ns: int, u: int) -> None:
+        """Account for the next line when its fields are already known."""
+        if self.records % self.every == 0:
+            self.entries.append((self.bytes, recv_ts_ns, event_ts_ns, u))
+        self.records += 1
+        self.bytes += nbytes
+
+    def write(self, path: Path) -> None:
+        """Write via .tmp + atomic rename."""
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, self.every, self.records, self.bytes))
+            f.write(b"".join(ENTRY.pack(*e) for e in self.entries))
+        tmp.replace(path)
+
+
+def read_index(path: Path) -> RecordIndex:
+    data = path.read_bytes()
+    magic, version, _, every, records, nbytes = HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError(f"{path.name}: not a version {INDEX_VERSION} record index")
+    idx = RecordIndex(every)
+    idx.records = records
+    idx.bytes = nbytes
+    idx.entries = list(ENTRY.iter_unpack(data[HEADER.size:]))
+    return idx
+
+
+def build_index(path: Path, every: int = INDEX_EVERY) -> RecordIndex:
+    """Index an existing (plain or compressed) JSONL file by scanning it."""
+    idx = RecordIndex(every)
+    with open_raw(path) as f:
+        for line in f:
+            idx.add_line(line)
+    return idx
+
+
+# =========================
+# SEEK
+# =========================
+
+def seek_offset(idx: RecordIndex, key: str, target: int) -> int:
+    """
+    Byte offset to start scanning from for the first record with key >= target.
+
+    Binary search over the entries, so it assumes key is non-decreasing
+    through the file (recv_ts_ns always is for one writer; u is unless a
+    redundant capture wrote a late delta).
+    """
+    k = KEYS.index(key) + 1
+    keys = [e[k] for e in idx.entries]
+    i = bisect_left(keys, target) - 1
+    return idx.entries[i][0] if i >= 0 else 0
+
+
+def iter_lines_from(
+    path: Path,
+    *,
+    key: str,
+    target: int,
+    index_path: Optional[Path] = None,
+) -> Iterator[bytes]:
+    """
+    Lines of path from the first record with key >= target onwards.
+
+    Seeks with the index sidecar (default: index_filename next to path)
+    and decodes at most one index stride of lines to find the start;
+    without a sidecar the file is scanned from the beginning. For
+    compressed files offsets are in the decompressed stream, so the
+    prefix is still decompressed, but not parsed.
+    """
+    if key not in KEYS:
+        raise ValueError(f"key must be one of {KEYS}")
+    index_path = index_path if index_path is not None else path.with_name(index_filename(path.name))
+    offset = seek_offset(read_index(index_path), key, target) if index_path.exists() else 0
+
+    with open_raw(path) as f:
+        if codec_of(path) is None:
+            f.seek(offset)
+        else:
+            while offset > 0:
+                skipped = len(f.read(min(offset, 1024 * 1024)))
+                if not skipped:
+                    return
+                offset -= skipped
+
+        for line in f:
+            rec = orjson.loads(line)
+            value = rec.get(key)
+            if key == "event_ts_ns" and value is None and "event_ts_ms" in rec:
+                value = rec["event_ts_ms"] * 1_000_000
+            if value is not None and value >= target:
+                yield line
+                yield from f
+                return
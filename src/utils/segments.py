@@ -0,0 +1,29 @@
+from pathlib import Path
+
+# =========================
+# LATE SEGMENTS
+# =========================
+
+# A finalized minute file is never modified. Items for its bucket that
+# arrive afterwards (past the writer's grace window, or after a recorder
+# restart within the minute) go to numbered segment files next to it:
+#
+#   deltas_utcmin_X.jsonl[.zst]      segment 0, the minute file itself
+#   deltas_utcmin_X.1.jsonl[.zst]    first late segment
+#   deltas_utcmin_X.2.jsonl[.zst]    ...
+#
+# Each segment is a complete file of its own (own .tmp, .idx, outputs).
+
+
+def segment_name(name: str, segment: int) -> str:
+    """deltas_utcmin_X.jsonl[.zst] -> deltas_utcmin_X.<segment>.jsonl[.zst] (0: unchanged)."""
+    if segment == 0:
+        return name
+    head, _, rest = name.partition(".")
+    return f"{head}.{segment}.{rest}"
+
+
+def segment_of(path: Path) -> int:
+    """Segment number of a minute file name, 0 for the minute file itself."""
+    parts = path.name.split(".")
+    return int(parts[1]) if len(parts) > 2 and parts[1].isdigit() else 0
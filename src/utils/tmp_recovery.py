@@ -0,0 +1,295 @@
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+
+from src.utils.compression import codec_of, compress_stream, iter_decompressed, strip_codec_suffix
+from src.utils.framing import FILE_HEADER, FRAMES_SUFFIX, check_file_header, complete_length, frames_complete_end
+
+# =========================
+# CONFIG
+# =========================
+
+# Writer .tmp files (plain and compressed); stats/snapshot .tmp files are
+# rewritten whole and never need recovery.
+TMP_PATTERNS = (
+    "*.jsonl.tmp", "*.jsonl.zst.tmp", "*.jsonl.gz.tmp",
+    "*.frames.tmp", "*.frames.zst.tmp", "*.frames.gz.tmp",
+)
+
+RECOVERY_LOG = "recovery.jsonl"
+QUARANTINE_DIR = "quarantine"
+
+# A .tmp untouched for this long is treated as orphaned. Live writers
+# flush at least every FLUSH_INTERVAL_SEC and rotate minutes within
+# ROTATE_GRACE_SEC, so this only guards against racing a running writer.
+ORPHAN_MIN_AGE_SEC = 120.0
+
+SCAN_CHUNK = 64 * 1024
+
+
+# =========================
+# PLAIN FILES
+# =========================
+
+def last_newline_end(path: Path) -> int:
+    """Offset just past the last b"\\n" in path (0 if none), scanning backwards."""
+    with path.open("rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(SCAN_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx >= 0:
+                return pos + idx + 1
+    return 0
+
+
+def _last_line(path: Path, end: int) -> bytes:
+    """Last complete line of path, given end = last_newline_end(path) > 0."""
+    with path.open("rb") as f:
+        tail = b""
+        pos = end - 1  # exclude its newline
+        while pos > 0:
+            step = min(SCAN_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            idx = tail.rfind(b"\n")
+            if idx >= 0:
+                return tail[idx + 1:]
+        return tail
+
+
+def _is_json_object(line: bytes) -> bool:
+    try:
+        return isinstance(orjson.loads(line), dict)
+    except orjson.JSONDecodeError:
+        return False
+
+
+def _recover_plain(tmp: Path) -> dict:
+    size = tmp.stat().st_size
+    end = last_newline_end(tmp)
+    if end == 0:
+        return {"size": size, "kept_bytes": 0, "dropped_bytes": size, "reason": "no_complete_lines"}
+
+    with tmp.open("rb") as f:
+        first = f.readline()
+    last = _last_line(tmp, end)
+    out = {"size": size, "kept_bytes": end, "dropped_bytes": size - end}
+    if not (_is_json_object(first) and _is_json_object(last)):
+        out["reason"] = "invalid_json"
+        return out
+
+    if end < size:
+        os.truncate(tmp, end)
+    return out
+
+
+# =========================
+# COMPRESSED FILES
+# =========================
+
+def _recover_compressed(tmp: Path, codec: str) -> dict:
+    """
+    Re-encode the decodable complete lines of a compressed .tmp in place.
+
+    A crash leaves an unterminated frame/member that open_raw rejects,
+    so unlike plain files the stream has to be rewritten. Byte counts
+    are uncompressed.
+    """
+    size = tmp.stat().st_size
+    part = tmp.with_name(tmp.name + ".part")
+    kept = dropped = 0
+    first = last = b""
+    with tmp.open("rb") as fin:
+        out = compress_stream(part.open("wb"), codec)
+        try:
+            pending = b""
+            for chunk in iter_decompressed(fin, codec):
+                data = pending + chunk
+                cut = data.rfind(b"\n") + 1
+                if cut:
+                    block = data[:cut]
+                    out.write(block)
+                    kept += cut
+                    if not first:
+                        first = block[:block.find(b"\n")]
+                    last = block[block.rfind(b"\n", 0, cut - 1) + 1:cut - 1]
+                pending = data[cut:]
+            dropped = len(pending)
+        finally:
+            out.close()
+
+    result = {"size": size, "kept_bytes": kept, "dropped_bytes": dropped}
+    if not kept:
+        result["reason"] = "no_complete_lines"
+    elif not (_is_json_object(first) and _is_json_object(last)):
+        result["reason"] = "invalid_json"
+    if "reason" in result:
+        part.unlink()
+    else:
+        part.replace(tmp)
+    return result
+
+
+# =========================
+# FRAMED FILES
+# =========================
+
+def _recover_frames_plain(tmp: Path) -> dict:
+    size = tmp.stat().st_size
+    try:
+        end = frames_complete_end(tmp)
+    except ValueError:
+        return {"size": size, "kept_bytes": 0, "dropped_bytes": size, "reason": "invalid_header"}
+    out = {"size": size, "kept_bytes": end, "dropped_bytes": size - end}
+    if end == FILE_HEADER.size:
+        out["reason"] = "no_complete_records"
+        return out
+    if end < size:
+        os.truncate(tmp, end)
+    return out
+
+
+def _recover_frames_compressed(tmp: Path, codec: str) -> dict:
+    """Like _recover_compressed, cutting at the last complete record."""
+    size = tmp.stat().st_size
+    part = tmp.with_name(tmp.name + ".part")
+    kept = 0
+    reason = None
+    with tmp.open("rb") as fin:
+        out = compress_stream(part.open("wb"), codec)
+        try:
+            pending = b""
+            start = None
+            for chunk in iter_decompressed(fin, codec):
+                data = pending + chunk
+                if start is None:
+                    if len(data) < FILE_HEADER.size:
+                        pending = data
+                        continue
+                    try:
+                        check_file_header(data, tmp.name)
+                    except ValueError:
+                        reason = "invalid_header"
+                        break
+                    start = FILE_HEADER.size
+                cut = complete_length(data, start)
+                out.write(data[:cut])
+                kept += cut
+                pending = data[cut:]
+                start = 0
+            dropped = len(pending)
+        finally:
+            out.close()
+
+    if reason is None and kept <= FILE_HEADER.size:
+        reason = "no_complete_records"
+    result = {"size": size, "kept_bytes": kept, "dropped_bytes": dropped}
+    if reason is not None:
+        result["reason"] = reason
+        part.unlink()
+    else:
+        part.replace(tmp)
+    return result
+
+
+# =========================
+# RECOVERY PASS
+# =========================
+
+def list_orphan_tmp_files(raw_dir: Path, *, min_age_sec: float = ORPHAN_MIN_AGE_SEC) -> List[Path]:
+    cutoff = time.time() - min_age_sec
+    found = set()
+    for pattern in TMP_PATTERNS:
+        for p in raw_dir.glob(pattern):
+            if p.is_file() and p.stat().st_mtime <= cutoff:
+                found.add(p)
+    return sorted(found)
+
+
+def _quarantine(tmp: Path) -> Path:
+    qdir = tmp.parent / QUARANTINE_DIR
+    qdir.mkdir(exist_ok=True)
+    dest = qdir / tmp.name
+    shutil.move(str(tmp), dest)
+    return dest
+
+
+def recover_tmp(tmp: Path) -> dict:
+    """
+    Finalize one orphaned writer .tmp file.
+
+    The file is cut back to its last complete line, its first and last
+    lines are checked to be JSON objects, and it is renamed to its final
+    name. Files with no complete line, invalid lines or an existing final
+    file are moved to <dir>/quarantine/ instead. Plain files are scanned
+    backwards from the end, so only the truncated tail is read.
+
+    .frames files are cut back to their last complete record instead,
+    after checking the file header (reasons invalid_header and
+    no_complete_records).
+
+    Returns the record appended to the recovery log.
+    """
+    final = tmp.with_suffix("")
+    codec = codec_of(final)
+    framed = strip_codec_suffix(final).suffix == FRAMES_SUFFIX
+    try:
+        if framed:
+            result = _recover_frames_plain(tmp) if codec is None else _recover_frames_compressed(tmp, codec)
+        elif codec is None:
+            result = _recover_plain(tmp)
+        else:
+            result = _recover_compressed(tmp, codec)
+    except (OSError, ValueError) as e:
+        result = {"reason": f"unreadable: {type(e).__name__}: {e}"}
+
+    if "reason" not in result and final.exists():
+        result["reason"] = "final_exists"
+
+    if "reason" in result:
+        result["action"] = "quarantined"
+        result["path"] = str(_quarantine(tmp))
+    else:
+        tmp.replace(final)
+        result["action"] = "finalized"
+        result["path"] = str(final)
+    return {"file": tmp.name, "codec": codec, "recovered_at_unix": int(time.time()), **result}
+
+
+def recover_orphans(
+    raw_dir: Path,
+    *,
+    min_age_sec: float = ORPHAN_MIN_AGE_SEC,
+    log_path: Optional[Path] = None,
+) -> List[dict]:
+    """
+    Recover every orphaned writer .tmp in raw_dir (see recover_tmp).
+
+    Only files not modified for min_age_sec are touched. Each outcome is
+    appended as one JSON line to log_path (default <raw_dir>/recovery.jsonl)
+    and printed.
+    """
+    if not raw_dir.is_dir():
+        return []
+    log_path = log_path if log_path is not None else raw_dir / RECOVERY_LOG
+    records = []
+    for tmp in list_orphan_tmp_files(raw_dir, min_age_sec=min_age_sec):
+        rec = recover_tmp(tmp)
+        records.append(rec)
+        with log_path.open("ab") as f:
+            f.write(orjson.dumps(rec) + b"\n")
+        print(
+            f"[recovery] {rec['file']}: {rec['action']}"
+            + (f" ({rec['reason']})" if "reason" in rec else "")
+            + (f", dropped {rec['dropped_bytes']} trailing bytes"
+               if rec["action"] == "finalized" and rec["dropped_bytes"] else "")
+        )
+    return records
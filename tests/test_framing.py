@@ -0,0 +1,151 @@
+from importlib.util import find_spec
+
+import orjson
+import pytest
+
+from src.ingestion.writers.rotating_jsonl_writer import RotatingJSONLWriter, WriteItem, WriterConfig
+from src.pipelines.normalize_l2 import iter_raw_lines, list_raw_files
+from src.utils.compression import CODEC_SUFFIX
+from src.utils.framing import (
+    FILE_HEADER,
+    FRAMES_MAGIC,
+    FRAMES_VERSION,
+    MISSING,
+    RECORD_HEADER,
+    build_frames_index,
+    check_file_header,
+    complete_length,
+    encode_frame,
+    file_header,
+    frame_line,
+    frames_complete_end,
+    iter_frames,
+    iter_frames_from,
+)
+from src.utils.record_index import index_filename, read_index
+
+CODECS = [
+    None,
+    pytest.param("zstd", marks=pytest.mark.skipif(find_spec("zstandard") is None, reason="zstandard not installed")),
+    "gzip",
+]
+
+
+def payload(u: int) -> bytes:
+    return orjson.dumps({
+        "e": "depthUpdate", "E": 1000 + u, "T": 999 + u, "s": "BTCUSDT",
+        "U": 10 * u, "u": u, "pu": u - 1, "b": [["1.0", str(u)]], "a": [["2.0", "1"]],
+    })
+
+
+def record(u: int, pu=True) -> bytes:
+    return encode_frame(
+        payload(u), conn_id=3, recv_ts_ns=u * 1000, event_ts_ms=1000 + u, U=10 * u, u=u,
+        pu=u - 1 if pu else None,
+    )
+
+
+def write_frames(tmp_path, us, codec=None, index_every=None):
+    """Record us as one minute through the writer; returns the finalized file."""
+    w = RotatingJSONLWriter(
+        tmp_path,
+        filename_fn=lambda b: f"deltas_utcmin_{b}.jsonl",
+        config=WriterConfig(framing="frames", compression=codec, index_every=index_every),
+    )
+    w.write_batch([WriteItem(7, record(u)) for u in us])
+    w.close()
+    return tmp_path / ("deltas_utcmin_7.frames" + (CODEC_SUFFIX[codec] if codec else ""))
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_writer_reader_round_trip(tmp_path, codec):
+    path = write_frames(tmp_path, range(1, 51), codec)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name]
+    recs = list(iter_frames(path))
+    assert [p for _, p in recs] == [payload(u) for u in range(1, 51)]
+    h = recs[4][0]
+    assert (h.payload_len, h.conn_id, h.recv_ts_ns, h.event_ts_ms, h.U, h.u, h.pu) == (
+        len(payload(5)), 3, 5000, 1005, 50, 5, 4,
+    )
+
+
+def test_missing_pu_round_trips_as_missing(tmp_path):
+    path = tmp_path / "x.frames"
+    path.write_bytes(file_header() + record(1, pu=False))
+    ((h, _),) = iter_frames(path)
+    assert h.pu == MISSING
+
+
+@pytest.mark.parametrize("data, error", [
+    (b"DFR", "truncated file header"),
+    (FILE_HEADER.pack(b"JSON", FRAMES_VERSION, 0), "bad magic"),
+    (FILE_HEADER.pack(FRAMES_MAGIC, FRAMES_VERSION + 1, 0), "unsupported frames version"),
+])
+def test_file_header_check(tmp_path, data, error):
+    with pytest.raises(ValueError, match=error):
+        check_file_header(data)
+    path = tmp_path / "x.frames"
+    path.write_bytes(data + record(1) if len(data) == FILE_HEADER.size else data)
+    with pytest.raises(ValueError, match=error):
+        list(iter_frames(path))
+    with pytest.raises(ValueError, match=error):
+        frames_complete_end(path)
+
+
+def test_complete_length_stops_before_truncated_record():
+    whole = record(1) + record(2)
+    data = whole + record(3)[:-1]
+    assert complete_length(data) == len(whole)
+    assert complete_length(data[:len(record(1)) + RECORD_HEADER.size - 1]) == len(record(1))
+    assert complete_length(file_header() + whole, FILE_HEADER.size) == FILE_HEADER.size + len(whole)
+    assert complete_length(b"") == 0
+
+
+@pytest.mark.parametrize("cut", [1, RECORD_HEADER.size - 1, RECORD_HEADER.size + 3])
+def test_truncated_record_ends_iteration(tmp_path, cut):
+    good = file_header() + record(1) + record(2)
+    path = tmp_path / "x.frames.tmp"
+    path.write_bytes(good + record(3)[:cut])
+
+    assert frames_complete_end(path) == len(good)
+    assert [h.u for h, _ in iter_frames(path)] == [1, 2]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_header_filter_and_payload_skipping(tmp_path, codec):
+    path = write_frames(tmp_path, range(1, 51), codec)
+
+    sel = list(iter_frames(path, where=lambda h: h.u % 10 == 0))
+    assert [(h.u, p) for h, p in sel] == [(u, payload(u)) for u in range(10, 51, 10)]
+    heads = list(iter_frames(path, payloads=False))
+    assert [h.u for h, _ in heads] == list(range(1, 51))
+    assert all(p is None for _, p in heads)
+    assert list(iter_frames(path, where=lambda h: False)) == []
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_index_matches_rebuild_and_seeks(tmp_path, codec):
+    path = write_frames(tmp_path, range(1, 51), codec, index_every=7)
+
+    idx = read_index(tmp_path / index_filename(path.name))
+    rebuilt = build_frames_index(path, 7)
+    assert (idx.records, idx.bytes, idx.entries) == (rebuilt.records, rebuilt.bytes, rebuilt.entries)
+    for target in (1, 8, 23, 50):
+        assert next(iter_frames_from(path, key="u", target=target))[0].u == target
+    assert next(iter_frames_from(path, key="recv_ts_ns", target=20_500))[0].u == 21
+    assert list(iter_frames_from(path, key="u", target=51)) == []
+
+
+def test_normalizer_reads_frames_as_recorder_lines(tmp_path):
+    path = write_frames(tmp_path, [1, 2])
+
+    assert list_raw_files(tmp_path) == [path]
+    lines = list(iter_raw_lines(path))
+    assert lines == [frame_line(h, p) for h, p in iter_frames(path)]
+    rec = orjson.loads(lines[0])
+    assert {k: rec[k] for k in ("exchange", "symbol", "conn_id", "recv_ts_ns", "event_ts_ms", "U", "u", "pu")} == {
+        "exchange": "binance", "symbol": "BTCUSDT", "conn_id": 3, "recv_ts_ns": 1000,
+        "event_ts_ms": 1001, "U": 10, "u": 1, "pu": 0,
+    }
+    assert rec["b"] == [["1.0", "1"]]
@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+
+import orjson
+
+from src.pipelines.normalize_l2 import list_raw_files, process_raw_dir, process_raw_file, raw_stem
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "data/binance/BTCUSDT/raw"
+
+
+def test_list_raw_files_orders_late_segments_after_their_minute(tmp_path):
+    names = [
+        "deltas_utcmin_6.jsonl",
+        "deltas_utcmin_5.10.jsonl",
+        "deltas_utcmin_5.2.jsonl",
+        "deltas_utcmin_5.jsonl",
+        "deltas_utcmin_5.1.jsonl.zst",
+        "deltas_utcmin_4.jsonl",
+        # not finalized minute files
+        "deltas_utcmin_7.jsonl.tmp",
+        "deltas_utcmin_5.3.jsonl.tmp",
+        "deltas_utcmin_5.stats.json",
+        "deltas_utcmin_5.idx",
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    assert [p.name for p in list_raw_files(tmp_path)] == [
+        "deltas_utcmin_4.jsonl",
+        "deltas_utcmin_5.jsonl",
+        "deltas_utcmin_5.1.jsonl.zst",
+        "deltas_utcmin_5.2.jsonl",
+        "deltas_utcmin_5.10.jsonl",
+        "deltas_utcmin_6.jsonl",
+    ]
+    assert [p.name for p in list_raw_files(tmp_path, exclude={"deltas_utcmin_5.jsonl"})][1] == (
+        "deltas_utcmin_5.1.jsonl.zst"
+    )
+    assert raw_stem(tmp_path / "deltas_utcmin_5.1.jsonl.zst") == "deltas_utcmin_5.1"
+
+
+def test_late_segment_continues_its_minute_with_carry_book(tmp_path):
+    raw = min(RAW_DIR.glob("deltas_utcmin_*.jsonl"))
+    stem = raw_stem(raw)
+    lines = raw.read_bytes().splitlines(keepends=True)
+    half = len(lines) // 2
+
+    whole = tmp_path / "whole" / "raw"
+    split = tmp_path / "split" / "raw"
+    whole.mkdir(parents=True)
+    split.mkdir(parents=True)
+    (whole / raw.name).write_bytes(b"".join(lines))
+    (split / raw.name).write_bytes(b"".join(lines[:half]))
+    (split / f"{stem}.1.jsonl").write_bytes(b"".join(lines[half:]))
+
+    process_raw_dir(whole, carry_book=True)
+    process_raw_dir(split, carry_book=True)
+
+    def out(base: Path, sub: str, suffix: str, stems) -> bytes:
+        return b"".join((base.parent / sub / f"{s}{suffix}").read_bytes() for s in stems)
+
+    for sub, suffix in (("normalized", ".fp.jsonl"), ("prices", ".prices.jsonl")):
+        assert out(split, sub, suffix, [stem, f"{stem}.1"]) == out(whole, sub, suffix, [stem])
+    # the segment's checkpoint is the book at the end of the whole minute
+    assert out(split, "checkpoints", ".book.json", [f"{stem}.1"]) == out(whole, "checkpoints", ".book.json", [stem])
+
+
+def raw_line(U: int, u: int, pu=None) -> bytes:
+    rec = {
+        "exchange": "binance", "symbol": "BTCUSDT", "conn_id": 1,
+        "recv_ts_ns": u, "event_ts_ms": u, "U": U, "u": u,
+    }
+    if pu is not None:
+        rec["pu"] = pu
+    rec["b"], rec["a"] = [["100.0", "1"]], [["101.0", "1"]]
+    return orjson.dumps(rec) + b"\n"
+
+
+def test_pu_checks_continuity_but_is_not_emitted(tmp_path):
+    raw = tmp_path / "raw" / "deltas_utcmin_1.jsonl"
+    raw.parent.mkdir()
+    # futures ranges overlap (U <= prev_u), so the spot rule would see gaps
+    raw.write_bytes(
+        raw_line(10, 20, pu=5) + raw_line(15, 30, pu=20) + raw_line(25, 40, pu=30)
+        + raw_line(45, 50, pu=35)  # pu breaks the chain
+    )
+    dirs = [tmp_path / d for d in ("normalized", "prices", "audit")]
+    for d in dirs:
+        d.mkdir()
+
+    process_raw_file(raw, *dirs)
+
+    audit = json.loads((tmp_path / "audit" / "deltas_utcmin_1.audit.json").read_text())["stats"]
+    assert audit["gaps"] == 1
+    assert audit["first_gap"] == {"prev_u": 40, "U": 45, "u": 50, "line": 4, "pu": 35}
+    norm = (tmp_path / "normalized" / "deltas_utcmin_1.fp.jsonl").read_bytes()
+    records = [orjson.loads(l) for l in norm.splitlines()]
+    assert len(records) == 4
+    keys = ["exchange", "symbol", "conn_id", "recv_ts_ns", "event_ts_ns", "U", "u", "b", "a"]
+    assert all(list(r) == keys for r in records)
+
+
+def test_spot_rule_applies_without_pu(tmp_path):
+    raw = tmp_path / "raw" / "deltas_utcmin_1.jsonl"
+    raw.parent.mkdir()
+    raw.write_bytes(raw_line(10, 20) + raw_line(21, 30) + raw_line(15, 40) + raw_line(50, 60))
+    dirs = [tmp_path / d for d in ("normalized", "prices", "audit")]
+    for d in dirs:
+        d.mkdir()
+
+    process_raw_file(raw, *dirs)
+
+    audit = json.loads((tmp_path / "audit" / "deltas_utcmin_1.audit.json").read_text())["stats"]
+    assert audit["gaps"] == 1
+    assert audit["first_gap"] == {"prev_u": 40, "U": 50, "u": 60, "line": 4}
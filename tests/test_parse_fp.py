@@ -0,0 +1,68 @@
+from decimal import InvalidOperation
+from pathlib import Path
+
+import orjson
+import pytest
+
+from src.pipelines.normalize_l2 import PRICE_SCALE, QTY_SCALE, parse_fp, to_fp
+from src.utils.compression import open_raw
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "data/binance/BTCUSDT/raw"
+
+
+def _raw_levels():
+    """Every (price, qty) string pair in the recorded sample, .tmp files included."""
+    files = sorted(p for p in RAW_DIR.iterdir() if ".jsonl" in p.name)
+    assert files, f"no raw files in {RAW_DIR}"
+    for f in files:
+        with open_raw(f) as fh:
+            for line in fh:
+                try:
+                    rec = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # torn last line of a .tmp
+                for side in ("b", "a"):
+                    yield from rec.get(side, ())
+
+
+def test_fast_path_matches_decimal_on_recorded_data():
+    n = 0
+    for price, qty in _raw_levels():
+        assert parse_fp(price, PRICE_SCALE) == to_fp(price, PRICE_SCALE), price
+        assert parse_fp(qty, QTY_SCALE) == to_fp(qty, QTY_SCALE), qty
+        n += 1
+    assert n > 0
+
+
+@pytest.mark.parametrize("x", [
+    # plain decimals (fast path)
+    "92743.00", "0.031", "5.", ".5", "0", "00012.3400", "123456789.12345678",
+    # non-str values
+    5, 1.5, True, 0, 92743,
+    # signs
+    "-1.5", "+1.5", "-0.00000001", "-0",
+    # exponents
+    "1e3", "1E-8", "1.5e+2", "2.5E-9",
+    # more decimals than the scale holds
+    "0.123456789", "1.000000000", "0.000000005", "1.999999999999",
+    # whitespace and non-ASCII digits (Decimal accepts both)
+    " 1.5", "1.5 ", "١٢٣",
+])
+@pytest.mark.parametrize("scale", [PRICE_SCALE, 10**2, 1, 1000 * 7])
+def test_parse_fp_matches_to_fp(x, scale):
+    try:
+        expected = to_fp(x, scale)
+    except (InvalidOperation, ValueError, TypeError) as e:
+        with pytest.raises(type(e)):
+            parse_fp(x, scale)
+        return
+    assert parse_fp(x, scale) == expected
+
+
+@pytest.mark.parametrize("x", ["", ".", "abc", "1.2.3", "NaN", "Infinity"])
+def test_parse_fp_rejects_like_to_fp(x):
+    with pytest.raises(Exception) as expected:
+        to_fp(x, PRICE_SCALE)
+    with pytest.raises(expected.type):
+        parse_fp(x, PRICE_SCALE)
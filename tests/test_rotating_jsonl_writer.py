@@ -0,0 +1,68 @@
+import json
+
+from src.ingestion.writers.rotating_jsonl_writer import RotatingJSONLWriter, WriteItem, WriterConfig
+
+
+def minute_filename(bucket: int) -> str:
+    return f"deltas_utcmin_{bucket}.jsonl"
+
+
+def line(bucket: int, n: int) -> bytes:
+    return b'{"bucket":%d,"n":%d}\n' % (bucket, n)
+
+
+def test_open_buckets_finalizes_oldest_bucket(tmp_path):
+    w = RotatingJSONLWriter(tmp_path, filename_fn=minute_filename, config=WriterConfig(open_buckets=2))
+    for n, bucket in enumerate([1, 2, 1, 3, 2]):
+        w.write(WriteItem(bucket, line(bucket, n)))
+    w.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "deltas_utcmin_1.jsonl",
+        "deltas_utcmin_2.jsonl",
+        "deltas_utcmin_3.jsonl",
+    ]
+    assert (tmp_path / "deltas_utcmin_1.jsonl").read_bytes() == line(1, 0) + line(1, 2)
+    assert (tmp_path / "deltas_utcmin_2.jsonl").read_bytes() == line(2, 1) + line(2, 4)
+    assert (tmp_path / "deltas_utcmin_3.jsonl").read_bytes() == line(3, 3)
+
+
+def timed(bucket: int, n: int) -> WriteItem:
+    return WriteItem(bucket, line(bucket, n), event_ts_ms=1, recv_ts_ns=2_000_000, enqueue_ts_ns=3_000_000)
+
+
+def test_late_item_goes_to_segment_and_leaves_finalized_file_alone(tmp_path):
+    w = RotatingJSONLWriter(tmp_path, filename_fn=minute_filename, config=WriterConfig(latency_stats=True))
+    w.write_batch([timed(5, 0), timed(5, 1), timed(6, 2)])
+    final = tmp_path / "deltas_utcmin_5.jsonl"
+    before = final.read_bytes()
+    stat_before = final.stat()
+
+    w.write(timed(5, 3))
+    w.close()
+
+    assert final.read_bytes() == before == line(5, 0) + line(5, 1)
+    assert final.stat().st_mtime_ns == stat_before.st_mtime_ns
+    assert (tmp_path / "deltas_utcmin_5.1.jsonl").read_bytes() == line(5, 3)
+    assert (tmp_path / "deltas_utcmin_6.jsonl").read_bytes() == line(6, 2)
+    assert not list(tmp_path.glob("*.tmp"))
+    # the minute's sidecar keeps the counts written before the late item
+    sidecar = json.loads((tmp_path / "deltas_utcmin_5.stats.json").read_text())
+    assert sidecar["file"] == "deltas_utcmin_5.jsonl"
+    assert sidecar["late_files"] == ["deltas_utcmin_5.1.jsonl"]
+    assert sidecar["event_to_recv"]["count"] == 3
+
+
+def test_restarted_writer_adds_next_segment(tmp_path):
+    for n in range(3):
+        w = RotatingJSONLWriter(tmp_path, filename_fn=minute_filename)
+        w.write(WriteItem(5, line(5, n)))
+        w.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "deltas_utcmin_5.1.jsonl",
+        "deltas_utcmin_5.2.jsonl",
+        "deltas_utcmin_5.jsonl",
+    ]
+    assert (tmp_path / "deltas_utcmin_5.jsonl").read_bytes() == line(5, 0)
+    assert (tmp_path / "deltas_utcmin_5.2.jsonl").read_bytes() == line(5, 2)
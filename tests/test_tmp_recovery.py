@@ -0,0 +1,149 @@
+import io
+import json
+from importlib.util import find_spec
+
+import pytest
+
+from src.utils.compression import CODEC_SUFFIX, compress_stream, open_raw
+from src.utils.framing import encode_frame, file_header, iter_frames
+from src.utils.tmp_recovery import QUARANTINE_DIR, RECOVERY_LOG, recover_orphans, recover_tmp
+
+LINES = [b'{"u":1,"b":[["1.0","2"]]}\n', b'{"u":2,"b":[["1.1","3"]]}\n']
+
+CODECS = [
+    None,
+    pytest.param("zstd", marks=pytest.mark.skipif(find_spec("zstandard") is None, reason="zstandard not installed")),
+    "gzip",
+]
+
+
+def write_tmp(path, data: bytes, codec):
+    """A writer .tmp holding data, as left by a crash (compressed streams flushed, not closed)."""
+    if codec is None:
+        path.write_bytes(data)
+        return
+    buf = io.BytesIO()
+    stream = compress_stream(buf, codec)
+    stream.write(data)
+    stream.flush()
+    path.write_bytes(buf.getvalue())
+
+
+def tmp_name(ext: str, codec) -> str:
+    return f"deltas_utcmin_5.{ext}{CODEC_SUFFIX[codec] if codec else ''}.tmp"
+
+
+def read_final(path) -> bytes:
+    with open_raw(path) as f:
+        return f.read()
+
+
+def record(u: int) -> bytes:
+    payload = b'{"e":"depthUpdate","E":%d,"s":"BTCUSDT","U":%d,"u":%d,"b":[],"a":[]}' % (1000 + u, u, u)
+    return encode_frame(payload, conn_id=1, recv_ts_ns=u * 1000, event_ts_ms=1000 + u, U=u, u=u, pu=u - 1)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_torn_last_line_is_truncated_and_finalized(tmp_path, codec):
+    tmp = tmp_path / tmp_name("jsonl", codec)
+    write_tmp(tmp, b"".join(LINES) + b'{"u":3,"b":[["1', codec)
+
+    rec = recover_tmp(tmp)
+
+    final = tmp.with_suffix("")
+    assert rec["action"] == "finalized" and "reason" not in rec
+    assert rec["kept_bytes"] == len(b"".join(LINES))
+    assert rec["dropped_bytes"] == len(b'{"u":3,"b":[["1')
+    assert not tmp.exists()
+    assert read_final(final) == b"".join(LINES)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_no_complete_line_is_quarantined(tmp_path, codec):
+    tmp = tmp_path / tmp_name("jsonl", codec)
+    write_tmp(tmp, b'{"u":1,"b":[["1', codec)
+
+    rec = recover_tmp(tmp)
+
+    assert rec["action"] == "quarantined"
+    assert rec["reason"] == "no_complete_lines"
+    assert not tmp.exists() and not tmp.with_suffix("").exists()
+    assert (tmp_path / QUARANTINE_DIR / tmp.name).exists()
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_existing_final_file_is_quarantined_and_kept(tmp_path, codec):
+    tmp = tmp_path / tmp_name("jsonl", codec)
+    final = tmp.with_suffix("")
+    write_tmp(tmp, b"".join(LINES), codec)
+    final.write_bytes(b"already finalized\n")
+
+    rec = recover_tmp(tmp)
+
+    assert rec["action"] == "quarantined"
+    assert rec["reason"] == "final_exists"
+    assert final.read_bytes() == b"already finalized\n"
+    assert (tmp_path / QUARANTINE_DIR / tmp.name).exists()
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_invalid_json_is_quarantined(tmp_path, codec):
+    tmp = tmp_path / tmp_name("jsonl", codec)
+    write_tmp(tmp, LINES[0] + b"not json\n", codec)
+
+    rec = recover_tmp(tmp)
+
+    assert rec["action"] == "quarantined"
+    assert rec["reason"] == "invalid_json"
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_frames_cut_mid_record_keeps_complete_records(tmp_path, codec):
+    tmp = tmp_path / tmp_name("frames", codec)
+    torn = record(3)[:-4]
+    write_tmp(tmp, file_header() + record(1) + record(2) + torn, codec)
+
+    rec = recover_tmp(tmp)
+
+    final = tmp.with_suffix("")
+    assert rec["action"] == "finalized" and "reason" not in rec
+    assert rec["dropped_bytes"] == len(torn)
+    assert [h.u for h, _ in iter_frames(final)] == [1, 2]
+    assert read_final(final) == file_header() + record(1) + record(2)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_frames_without_complete_record_are_quarantined(tmp_path, codec):
+    tmp = tmp_path / tmp_name("frames", codec)
+    write_tmp(tmp, file_header() + record(1)[:10], codec)
+
+    rec = recover_tmp(tmp)
+
+    assert rec["action"] == "quarantined"
+    assert rec["reason"] == "no_complete_records"
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_frames_with_bad_header_are_quarantined(tmp_path, codec):
+    tmp = tmp_path / tmp_name("frames", codec)
+    write_tmp(tmp, b"XXXX\x01\x00\x00\x00" + record(1), codec)
+
+    rec = recover_tmp(tmp)
+
+    assert rec["action"] == "quarantined"
+    assert rec["reason"] == "invalid_header"
+
+
+def test_recover_orphans_skips_fresh_files_and_logs(tmp_path):
+    tmp = tmp_path / tmp_name("jsonl", None)
+    write_tmp(tmp, b"".join(LINES) + b"{", None)
+
+    assert recover_orphans(tmp_path) == []
+    assert tmp.exists()
+
+    records = recover_orphans(tmp_path, min_age_sec=0)
+
+    assert [r["action"] for r in records] == ["finalized"]
+    assert tmp.with_suffix("").read_bytes() == b"".join(LINES)
+    log = [json.loads(l) for l in (tmp_path / RECOVERY_LOG).read_text().splitlines()]
+    assert log == records